@@ -3,6 +3,8 @@ from flask_jwt_extended import JWTManager
 from extensions import db, migrate
 from config import Config
 from routes import register_blueprints
+from utils.request_cache import clear_permission_memo
+from utils.json_provider import init_json_provider, init_db_json_serializer
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -10,10 +12,40 @@ import os
 load_dotenv()  # charge les variables d'environnement depuis .env
 print("STORAGE_ROOT:", os.getenv("STORAGE_ROOT"))
 
+# Durée (s) pendant laquelle le navigateur réutilise une réponse de prévol CORS
+# au lieu d'envoyer un OPTIONS avant chaque requête (Chrome plafonne à 7200)
+CORS_PREFLIGHT_MAX_AGE = int(os.getenv("CORS_PREFLIGHT_MAX_AGE", "600"))
+
+# Constantes CORS construites une seule fois à l'import plutôt qu'à chaque requête
+CORS_ALLOWED_ORIGINS = frozenset({
+    "http://localhost:5173", "http://localhost:5174", "http://127.0.0.1:5173",
+    "http://127.0.0.1:5174", "http://localhost:3000", "null"
+})
+CORS_ALLOWED_HEADERS = "Content-Type,Authorization,X-Requested-With"
+CORS_ALLOWED_METHODS = "GET,POST,PUT,DELETE,OPTIONS"
+_CORS_PREFLIGHT_MAX_AGE_HEADER = str(CORS_PREFLIGHT_MAX_AGE)
+
+
+def _apply_cors_headers(response, origin):
+    """Ajoute les en-têtes CORS communs au prévol et aux réponses normales"""
+    if origin is None or origin in CORS_ALLOWED_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin or "*"
+    response.headers["Access-Control-Allow-Headers"] = CORS_ALLOWED_HEADERS
+    response.headers["Access-Control-Allow-Methods"] = CORS_ALLOWED_METHODS
+    response.headers["Access-Control-Allow-Credentials"] = "true"
+    # La réponse dépend de l'Origin : une réponse mise en cache ne doit pas servir une autre origine
+    response.vary.add("Origin")
+    return response
+
+
 def create_app():
     app = Flask(__name__, static_folder='static')
     app.config.from_object(Config)
 
+    # ✅ Sérialisation JSON via orjson quand il est disponible (réponses et colonnes JSON)
+    init_json_provider(app)
+    init_db_json_serializer(app)
+
     # ✅ Configuration JWT claire
     app.config["JWT_ERROR_MESSAGE_KEY"] = "msg"
     
@@ -22,37 +54,30 @@ def create_app():
 
     # Enable CORS for development - very permissive for debugging
     CORS(app, 
-         origins=["http://localhost:5173", "http://localhost:5174", "http://127.0.0.1:5173", "http://127.0.0.1:5174", "http://localhost:3000", "null"],
-         allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         supports_credentials=True)
+         origins=sorted(CORS_ALLOWED_ORIGINS),
+         allow_headers=CORS_ALLOWED_HEADERS.split(","),
+         methods=CORS_ALLOWED_METHODS.split(","),
+         supports_credentials=True,
+         max_age=CORS_PREFLIGHT_MAX_AGE)
 
     @app.before_request
     def handle_preflight():
         # Autoriser toutes les requêtes OPTIONS (prévol CORS)
+        # Enregistré en premier : un prévol est servi avant tout autre traitement de la requête
+        # (les en-têtes CORS communs sont ajoutés une seule fois par after_request)
         if request.method == "OPTIONS":
             response = make_response()
-            origin = request.headers.get('Origin')
-            allowed_origins = ["http://localhost:5173", "http://localhost:5174", "http://127.0.0.1:5173", "http://127.0.0.1:5174", "http://localhost:3000", "null"]
-            
-            if origin in allowed_origins or origin is None:
-                response.headers["Access-Control-Allow-Origin"] = origin or "*"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Requested-With"
-            response.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,DELETE,OPTIONS"
-            response.headers["Access-Control-Allow-Credentials"] = "true"
+            response.headers["Access-Control-Max-Age"] = _CORS_PREFLIGHT_MAX_AGE_HEADER
             return response
 
+    @app.before_request
+    def reset_permission_memo():
+        # Repartir d'un cache de permissions vide à chaque requête
+        clear_permission_memo()
+
     @app.after_request
     def after_request(response):
-        origin = request.headers.get('Origin')
-        allowed_origins = ["http://localhost:5173", "http://localhost:5174", "http://127.0.0.1:5173", "http://127.0.0.1:5174", "http://localhost:3000", "null"]
-        
-        if origin in allowed_origins or origin is None:
-            response.headers["Access-Control-Allow-Origin"] = origin or "*"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Requested-With"
-        response.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,DELETE,OPTIONS"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
+        return _apply_cors_headers(response, request.headers.get('Origin'))
 
     # Init extensions
     db.init_app(app)
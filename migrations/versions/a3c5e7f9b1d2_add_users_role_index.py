@@ -0,0 +1,24 @@
+"""add_users_role_index
+
+Revision ID: a3c5e7f9b1d2
+Revises: 927983dbcb22
+Create Date: 2026-10-17 09:12:41.204117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b1d2'
+down_revision = '927983dbcb22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index for users table - optimize role-based lookups
+    op.create_index('idx_users_role', 'users', ['role'])
+
+
+def downgrade():
+    op.drop_index('idx_users_role', 'users')
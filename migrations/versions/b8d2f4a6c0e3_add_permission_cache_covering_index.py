@@ -0,0 +1,55 @@
+"""add_permission_cache_covering_index
+
+Revision ID: b8d2f4a6c0e3
+Revises: a3c5e7f9b1d2
+Create Date: 2026-10-17 10:03:27.518342
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d2f4a6c0e3'
+down_revision = 'a3c5e7f9b1d2'
+branch_labels = None
+depends_on = None
+
+# Columns loaded by PermissionCache lookups, carried in the index so that
+# (user_id, resource_type, resource_id) lookups can be answered index-only
+COVERED_COLUMNS = [
+    'id', 'can_read', 'can_write', 'can_delete', 'can_share', 'is_owner',
+    'permission_source', 'cached_at', 'expires_at'
+]
+
+
+def upgrade():
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_perm_cache_user_resource_covering',
+            'permission_cache',
+            ['user_id', 'resource_type', 'resource_id'],
+            postgresql_include=COVERED_COLUMNS,
+            postgresql_concurrently=True
+        )
+        # Same key columns as the covering index, now redundant
+        op.drop_index(
+            'idx_perm_cache_user_resource',
+            table_name='permission_cache',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_perm_cache_user_resource',
+            'permission_cache',
+            ['user_id', 'resource_type', 'resource_id'],
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'idx_perm_cache_user_resource_covering',
+            table_name='permission_cache',
+            postgresql_concurrently=True
+        )
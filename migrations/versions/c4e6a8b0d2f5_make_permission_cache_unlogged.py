@@ -0,0 +1,26 @@
+"""make_permission_cache_unlogged
+
+Revision ID: c4e6a8b0d2f5
+Revises: b8d2f4a6c0e3
+Create Date: 2026-10-17 14:52:08.731904
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e6a8b0d2f5'
+down_revision = 'b8d2f4a6c0e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # permission_cache only holds derived data that is recomputed on a miss:
+    # skip WAL writes for it. After a crash PostgreSQL truncates the table,
+    # which simply means a cold cache.
+    op.execute('ALTER TABLE permission_cache SET UNLOGGED')
+
+
+def downgrade():
+    op.execute('ALTER TABLE permission_cache SET LOGGED')
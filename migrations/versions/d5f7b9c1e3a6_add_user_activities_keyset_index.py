@@ -0,0 +1,53 @@
+"""add_user_activities_keyset_index
+
+Revision ID: d5f7b9c1e3a6
+Revises: c4e6a8b0d2f5
+Create Date: 2026-10-17 16:12:08.204517
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f7b9c1e3a6'
+down_revision = 'c4e6a8b0d2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # user_activities is created from the model (db.create_all), so the new
+    # index may already exist and the old one may never have been built
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_activities_user_created_id',
+            'user_activities',
+            ['user_id', 'created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        # Prefix of the keyset index, now redundant
+        op.drop_index(
+            'idx_user_activities_user_period',
+            table_name='user_activities',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_activities_user_period',
+            'user_activities',
+            ['user_id', 'created_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'idx_user_activities_user_created_id',
+            table_name='user_activities',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from extensions import db
 from .file_permission import FilePermission
 from utils.performance_logger import performance_monitor, PerformanceTracker, log_permission_query_stats
+from utils.request_cache import request_memoized_permissions
 
 class File(db.Model):
     __tablename__ = "files"
@@ -25,6 +26,7 @@ class File(db.Model):
 
 
     @performance_monitor("File.get_effective_permissions", log_threshold_ms=50.0)
+    @request_memoized_permissions("file")
     def get_effective_permissions(self, user):
         """
         Get effective permissions for a user on this file.
@@ -180,15 +182,70 @@ class File(db.Model):
             from utils.performance_logger import performance_logger
             performance_logger.error(f"Error in bulk permission check for files: {str(e)}")
             
-            # Fallback to individual checks
+            # Fallback to the set-based legacy resolution
+            return cls._get_bulk_effective_permissions_legacy(user, file_ids)
+    
+    @classmethod
+    def _get_bulk_effective_permissions_legacy(cls, user, file_ids):
+        """
+        Set-based version of _get_effective_permissions_legacy for many files.
+        Direct and group permissions are loaded with one query, and files without
+        their own permission inherit from their folders resolved in bulk.
+        
+        Args:
+            user: User object
+            file_ids: List of file IDs
+            
+        Returns:
+            Dictionary mapping file_id to FilePermission/FolderPermission (or None)
+        """
+        from .folder import Folder
+        
+        with PerformanceTracker("File.get_bulk_effective_permissions_legacy") as tracker:
+            # Same priority as the legacy method: user permission, then groups in order
+            group_rank = {group.id: rank for rank, group in enumerate(user.groups, start=1)}
+            
+            # 🔹 Permissions directes et via groupes en une requête
+            own_permissions = {}
+            best_rank = {}
+            if file_ids:
+                rows = FilePermission.query.filter(
+                    FilePermission.file_id.in_(file_ids),
+                    db.or_(
+                        FilePermission.user_id == user.id,
+                        FilePermission.group_id.in_(list(group_rank))
+                    )
+                ).all()
+                for perm in rows:
+                    rank = 0 if perm.user_id == user.id else group_rank.get(perm.group_id)
+                    if rank is not None and rank < best_rank.get(perm.file_id, len(group_rank) + 1):
+                        best_rank[perm.file_id] = rank
+                        own_permissions[perm.file_id] = perm
+            
+            # 🔹 Hériter des dossiers parents, résolus en lot
+            unresolved = [file_id for file_id in file_ids if file_id not in own_permissions]
+            folder_of = {}
+            if unresolved:
+                folder_of = dict(
+                    db.session.query(cls.id, cls.folder_id).filter(cls.id.in_(unresolved)).all()
+                )
+            folder_ids = list({folder_id for folder_id in folder_of.values() if folder_id is not None})
+            folder_permissions = Folder._get_bulk_effective_permissions_legacy(user, folder_ids) if folder_ids else {}
+            
             result = {}
             for file_id in file_ids:
-                file_obj = cls.query.get(file_id)
-                if file_obj:
-                    result[file_id] = file_obj.get_effective_permissions(user)
+                if file_id in own_permissions:
+                    result[file_id] = own_permissions[file_id]
                 else:
-                    result[file_id] = None
+                    result[file_id] = folder_permissions.get(folder_of.get(file_id))
             
+            log_permission_query_stats(
+                user_id=user.id,
+                resource_type="file",
+                resource_count=len(file_ids),
+                duration_ms=tracker.duration_ms,
+                method="legacy_bulk"
+            )
             return result
     
     @staticmethod
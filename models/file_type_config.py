@@ -3,6 +3,14 @@
 from extensions import db
 from datetime import datetime, timezone
 import json
+import os
+import time
+
+# Index MIME/extension -> id de configuration, partagé par le processus.
+# Reconstruit uniquement quand l'empreinte de la table change ; l'empreinte n'est
+# relue qu'au plus une fois par intervalle, pour voir les changements des autres workers.
+FILE_TYPE_INDEX_TTL_SECONDS = float(os.getenv('FILE_TYPE_INDEX_TTL_SECONDS', '30'))
+_lookup_index = {'fingerprint': None, 'checked_at': 0.0, 'by_mime_type': {}, 'by_extension': {}}
 
 class FileTypeConfig(db.Model):
     """Model for file type configuration settings"""
@@ -84,24 +92,58 @@ class FileTypeConfig(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    @classmethod
+    def _get_lookup_index(cls):
+        """
+        Return the MIME type / extension lookup index of enabled configurations.
+        The index is rebuilt only when the table fingerprint (row count, latest
+        update, highest id) changes. The fingerprint itself is read at most once per
+        FILE_TYPE_INDEX_TTL_SECONDS, so a lookup is normally a single primary key
+        fetch; changes made by other workers are seen within that interval.
+        """
+        now = time.monotonic()
+        if (_lookup_index['fingerprint'] is not None
+                and now - _lookup_index['checked_at'] < FILE_TYPE_INDEX_TTL_SECONDS):
+            return _lookup_index
+
+        fingerprint = tuple(db.session.query(
+            db.func.count(cls.id), db.func.max(cls.updated_at), db.func.max(cls.id)
+        ).one())
+
+        if _lookup_index['fingerprint'] != fingerprint:
+            by_mime_type = {}
+            by_extension = {}
+            for config in cls.query.filter_by(is_enabled=True).order_by(cls.id).all():
+                for mime_type in config.mime_types_list:
+                    by_mime_type.setdefault(mime_type, config.id)
+                for extension in config.extensions_list:
+                    by_extension.setdefault(extension, config.id)
+            _lookup_index.update(
+                fingerprint=fingerprint,
+                by_mime_type=by_mime_type,
+                by_extension=by_extension
+            )
+        _lookup_index['checked_at'] = now
+
+        return _lookup_index
+
+    @classmethod
+    def invalidate_lookup_index(cls):
+        """Force the next lookup to re-read the table fingerprint (after a local change)"""
+        _lookup_index['fingerprint'] = None
+
     @classmethod
     def get_config_for_mime_type(cls, mime_type):
         """Get configuration for a specific MIME type"""
-        configs = cls.query.filter_by(is_enabled=True).all()
-        for config in configs:
-            if mime_type in config.mime_types_list:
-                return config
-        return None
+        config_id = cls._get_lookup_index()['by_mime_type'].get(mime_type)
+        return db.session.get(cls, config_id) if config_id is not None else None
     
     @classmethod
     def get_config_for_extension(cls, extension):
         """Get configuration for a specific file extension"""
         clean_extension = extension.lower().lstrip('.')
-        configs = cls.query.filter_by(is_enabled=True).all()
-        for config in configs:
-            if clean_extension in config.extensions_list:
-                return config
-        return None
+        config_id = cls._get_lookup_index()['by_extension'].get(clean_extension)
+        return db.session.get(cls, config_id) if config_id is not None else None
     
     @classmethod
     def is_file_type_supported(cls, mime_type=None, extension=None):
@@ -3,6 +3,7 @@ from extensions import db
 from datetime import timezone
 from .folder_permission import FolderPermission
 from utils.performance_logger import performance_monitor, PerformanceTracker, log_permission_query_stats
+from utils.request_cache import request_memoized_permissions
 
 class Folder(db.Model):
     __tablename__ = "folders"
@@ -26,6 +27,7 @@ class Folder(db.Model):
         return f"<Folder {self.name}>"
 
     @performance_monitor("Folder.get_effective_permissions", log_threshold_ms=50.0)
+    @request_memoized_permissions("folder")
     def get_effective_permissions(self, user):
         """
         Get effective permissions for a user on this folder.
@@ -181,15 +183,70 @@ class Folder(db.Model):
             from utils.performance_logger import performance_logger
             performance_logger.error(f"Error in bulk permission check for folders: {str(e)}")
             
-            # Fallback to individual checks
+            # Fallback to the set-based legacy resolution
+            return cls._get_bulk_effective_permissions_legacy(user, folder_ids)
+    
+    @classmethod
+    def _get_bulk_effective_permissions_legacy(cls, user, folder_ids):
+        """
+        Set-based version of _get_effective_permissions_legacy for many folders.
+        Direct and group permissions of each hierarchy level are loaded with one query
+        and inheritance is resolved level by level, instead of per folder and per group.
+        
+        Args:
+            user: User object
+            folder_ids: List of folder IDs
+            
+        Returns:
+            Dictionary mapping folder_id to FolderPermission (or None)
+        """
+        with PerformanceTracker("Folder.get_bulk_effective_permissions_legacy") as tracker:
+            # Same priority as the legacy method: user permission, then groups in order
+            group_rank = {group.id: rank for rank, group in enumerate(user.groups, start=1)}
+            
+            own_permissions = {}
+            parent_of = {}
+            pending = set(folder_ids)
+            while pending:
+                # 🔹 Permissions directes et via groupes du niveau courant
+                rows = FolderPermission.query.filter(
+                    FolderPermission.folder_id.in_(pending),
+                    db.or_(
+                        FolderPermission.user_id == user.id,
+                        FolderPermission.group_id.in_(list(group_rank))
+                    )
+                ).all()
+                best_rank = {}
+                for perm in rows:
+                    rank = 0 if perm.user_id == user.id else group_rank.get(perm.group_id)
+                    if rank is not None and rank < best_rank.get(perm.folder_id, len(group_rank) + 1):
+                        best_rank[perm.folder_id] = rank
+                        own_permissions[perm.folder_id] = perm
+                
+                # 🔹 Remonter d'un niveau pour les dossiers sans permission propre
+                unresolved = [folder_id for folder_id in pending if folder_id not in own_permissions]
+                pending = set()
+                if unresolved:
+                    for folder_id, parent_id in db.session.query(cls.id, cls.parent_id).filter(cls.id.in_(unresolved)):
+                        if parent_id is not None and parent_id not in parent_of and parent_id not in own_permissions:
+                            pending.add(parent_id)
+                        parent_of[folder_id] = parent_id
+            
             result = {}
             for folder_id in folder_ids:
-                folder_obj = cls.query.get(folder_id)
-                if folder_obj:
-                    result[folder_id] = folder_obj.get_effective_permissions(user)
-                else:
-                    result[folder_id] = None
+                current, visited = folder_id, set()
+                while current is not None and current not in own_permissions and current not in visited:
+                    visited.add(current)
+                    current = parent_of.get(current)
+                result[folder_id] = own_permissions.get(current)
             
+            log_permission_query_stats(
+                user_id=user.id,
+                resource_type="folder",
+                resource_count=len(folder_ids),
+                duration_ms=tracker.duration_ms,
+                method="legacy_bulk"
+            )
             return result
     
     @classmethod
@@ -1,8 +1,58 @@
+import time
+from collections import namedtuple
 from datetime import datetime, timedelta
 from extensions import db
 
+# Coarse clock for cache expiry checks: TTLs are measured in hours, so a
+# "now" that is up to one second stale is accurate enough and avoids
+# calling datetime.utcnow() on every cache lookup.
+_COARSE_NOW_RESOLUTION_SECONDS = 1.0
+_cached_now = (0.0, None)
+
+
+def _coarse_utcnow():
+    """Return datetime.utcnow() refreshed at most once per resolution window."""
+    global _cached_now
+    monotonic_now = time.monotonic()
+    if _cached_now[1] is None or monotonic_now - _cached_now[0] > _COARSE_NOW_RESOLUTION_SECONDS:
+        _cached_now = (monotonic_now, datetime.utcnow())
+    return _cached_now[1]
+
+
+# Built once at import: invalidate_user_cache runs on every group/role change,
+# so the statement is reused instead of being rebuilt through Query.delete().
+_DELETE_USER_CACHE = db.text("DELETE FROM permission_cache WHERE user_id = :user_id")
+
+
+class PermissionBits(namedtuple('PermissionBits', 'can_read can_write can_delete can_share is_owner',
+                                 defaults=(False, False, False, False, False))):
+    """
+    Immutable carrier for the five permission flags stored in a cache entry.
+    Field order matches the column assignment done by PermissionCache.apply_bits.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, permissions_dict):
+        """Build from a legacy permissions dictionary (missing keys default to False)."""
+        return cls(
+            permissions_dict.get('can_read', False),
+            permissions_dict.get('can_write', False),
+            permissions_dict.get('can_delete', False),
+            permissions_dict.get('can_share', False),
+            permissions_dict.get('is_owner', False)
+        )
+
+    @classmethod
+    def coerce(cls, permissions):
+        """Accept either PermissionBits or a permissions dictionary."""
+        if isinstance(permissions, cls):
+            return permissions
+        return cls.from_dict(permissions)
+
 
 class PermissionCache(db.Model):
+    # Derived data only: the table is UNLOGGED in PostgreSQL (see migration c4e6a8b0d2f5)
     __tablename__ = "permission_cache"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -25,7 +75,9 @@ class PermissionCache(db.Model):
 
     # Indexes for efficient cache lookups
     __table_args__ = (
-        db.Index('idx_perm_cache_user_resource', 'user_id', 'resource_type', 'resource_id'),
+        db.Index('idx_perm_cache_user_resource_covering', 'user_id', 'resource_type', 'resource_id',
+                 postgresql_include=['id', 'can_read', 'can_write', 'can_delete', 'can_share', 'is_owner',
+                                     'permission_source', 'cached_at', 'expires_at']),
         db.Index('idx_perm_cache_expires', 'expires_at'),
         db.Index('idx_perm_cache_user_type', 'user_id', 'resource_type'),
         db.UniqueConstraint('user_id', 'resource_type', 'resource_id', name='uq_user_resource_perm')
@@ -52,18 +104,40 @@ class PermissionCache(db.Model):
             resource_type=resource_type,
             resource_id=resource_id
         ).filter(
-            cls.expires_at > datetime.utcnow()
+            cls.expires_at > _coarse_utcnow()
         ).first()
         
         return cache_entry
 
     @classmethod
-    def set_cached_permission(cls, user_id, resource_type, resource_id, permissions_dict, 
+    def get_cached_permissions_bulk(cls, user_id, resource_type, resource_ids):
+        """
+        Retrieve non-expired cache entries for many resources in a single query.
+        Returns a dictionary mapping resource_id to cache entry (misses are omitted).
+        """
+        if not resource_ids:
+            return {}
+
+        cache_entries = cls.query.filter(
+            cls.user_id == user_id,
+            cls.resource_type == resource_type,
+            cls.resource_id.in_(list(resource_ids)),
+            cls.expires_at > _coarse_utcnow()
+        ).all()
+
+        return {entry.resource_id: entry for entry in cache_entries}
+
+    @classmethod
+    def set_cached_permission(cls, user_id, resource_type, resource_id, permissions_dict,
                             permission_source='direct', expiration_hours=1):
         """
         Cache permission data for a user-resource combination.
         Updates existing cache entry or creates new one.
+        `permissions_dict` may be a PermissionBits or a plain permissions dictionary.
         """
+        bits = PermissionBits.coerce(permissions_dict)
+        now = datetime.utcnow()
+
         # Try to find existing cache entry
         cache_entry = cls.query.filter_by(
             user_id=user_id,
@@ -71,52 +145,126 @@ class PermissionCache(db.Model):
             resource_id=resource_id
         ).first()
 
-        if cache_entry:
-            # Update existing entry
-            cache_entry.can_read = permissions_dict.get('can_read', False)
-            cache_entry.can_write = permissions_dict.get('can_write', False)
-            cache_entry.can_delete = permissions_dict.get('can_delete', False)
-            cache_entry.can_share = permissions_dict.get('can_share', False)
-            cache_entry.is_owner = permissions_dict.get('is_owner', False)
-            cache_entry.permission_source = permission_source
-            cache_entry.cached_at = datetime.utcnow()
-            cache_entry.expires_at = datetime.utcnow() + timedelta(hours=expiration_hours)
-        else:
+        if not cache_entry:
             # Create new cache entry
             cache_entry = cls(
                 user_id=user_id,
                 resource_type=resource_type,
-                resource_id=resource_id,
-                can_read=permissions_dict.get('can_read', False),
-                can_write=permissions_dict.get('can_write', False),
-                can_delete=permissions_dict.get('can_delete', False),
-                can_share=permissions_dict.get('can_share', False),
-                is_owner=permissions_dict.get('is_owner', False),
-                permission_source=permission_source,
-                expires_at=datetime.utcnow() + timedelta(hours=expiration_hours)
+                resource_id=resource_id
             )
             db.session.add(cache_entry)
 
+        cache_entry.apply_bits(bits)
+        cache_entry.permission_source = permission_source
+        cache_entry.cached_at = now
+        cache_entry.expires_at = now + timedelta(hours=expiration_hours)
+
         return cache_entry
 
+    @classmethod
+    def set_cached_permissions_bulk(cls, user_id, resource_type, entries, expiration_hours=1):
+        """
+        Cache permission data for many resources of a single user at once.
+        Existing entries are fetched with one query and updated in place; missing
+        entries are written with a single multi-row INSERT, so the caller can
+        persist everything with a single commit.
+
+        Args:
+            user_id: ID of the user
+            resource_type: 'file' or 'folder'
+            entries: Dictionary mapping resource_id to (PermissionBits, permission_source)
+            expiration_hours: Cache lifetime in hours
+
+        Returns:
+            Number of cache entries written (updated + inserted)
+        """
+        if not entries:
+            return 0
+
+        existing = {
+            entry.resource_id: entry
+            for entry in cls.query.filter(
+                cls.user_id == user_id,
+                cls.resource_type == resource_type,
+                cls.resource_id.in_(list(entries.keys()))
+            ).all()
+        }
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=expiration_hours)
+        new_rows = []
+
+        for resource_id, (permissions, permission_source) in entries.items():
+            bits = PermissionBits.coerce(permissions)
+            cache_entry = existing.get(resource_id)
+            if cache_entry is None:
+                values = bits._asdict()
+                values.update(
+                    user_id=user_id,
+                    resource_type=resource_type,
+                    resource_id=resource_id,
+                    permission_source=permission_source,
+                    cached_at=now,
+                    expires_at=expires_at
+                )
+                new_rows.append(values)
+            else:
+                cache_entry.apply_bits(bits)
+                cache_entry.permission_source = permission_source
+                cache_entry.cached_at = now
+                cache_entry.expires_at = expires_at
+
+        if new_rows:
+            # One multi-row INSERT instead of one ORM object per entry
+            db.session.execute(db.insert(cls), new_rows)
+
+        return len(existing) + len(new_rows)
+
     @classmethod
     def invalidate_user_cache(cls, user_id):
         """
         Invalidate all cache entries for a specific user.
+        Returns the number of deleted entries.
         """
-        cls.query.filter_by(user_id=user_id).delete()
+        deleted_count = db.session.execute(_DELETE_USER_CACHE, {'user_id': user_id}).rowcount
         db.session.commit()
+        return deleted_count
 
     @classmethod
     def invalidate_resource_cache(cls, resource_type, resource_id):
         """
         Invalidate all cache entries for a specific resource.
+        Returns the number of deleted entries.
         """
-        cls.query.filter_by(
+        deleted_count = cls.query.filter_by(
             resource_type=resource_type,
             resource_id=resource_id
-        ).delete()
+        ).delete(synchronize_session=False)
         db.session.commit()
+        return deleted_count
+
+    @classmethod
+    def invalidate_resources_cache(cls, resource_type, resource_ids, user_ids=None):
+        """
+        Invalidate cache entries for several resources of the same type with a
+        single DELETE ... WHERE resource_id IN (...).
+        Optionally restricted to a list of users.
+        Returns the number of deleted entries.
+        """
+        resource_ids = list(resource_ids)
+        if not resource_ids:
+            return 0
+
+        query = cls.query.filter(
+            cls.resource_type == resource_type,
+            cls.resource_id.in_(resource_ids)
+        )
+        if user_ids:
+            query = query.filter(cls.user_id.in_(list(user_ids)))
+
+        deleted_count = query.delete(synchronize_session=False)
+        db.session.commit()
+        return deleted_count
 
     @classmethod
     def cleanup_expired_cache(cls):
@@ -135,10 +283,11 @@ class PermissionCache(db.Model):
         """
         Get cache statistics for monitoring.
         """
-        total_entries = cls.query.count()
-        expired_entries = cls.query.filter(
-            cls.expires_at <= datetime.utcnow()
-        ).count()
+        # Total and expired counts in a single aggregate query
+        total_entries, expired_entries = db.session.query(
+            db.func.count(cls.id),
+            db.func.count(db.case((cls.expires_at <= datetime.utcnow(), 1)))
+        ).one()
         active_entries = total_entries - expired_entries
         
         return {
@@ -165,6 +314,12 @@ class PermissionCache(db.Model):
             'expires_at': self.expires_at.isoformat() if self.expires_at else None
         }
 
+    def apply_bits(self, bits):
+        """
+        Assign the five permission flags from a PermissionBits in one unpack.
+        """
+        self.can_read, self.can_write, self.can_delete, self.can_share, self.is_owner = bits
+
     def is_expired(self):
         """
         Check if this cache entry has expired.
@@ -16,6 +16,11 @@ class User(db.Model):
     quota_mb = db.Column(db.Integer, default=2048)
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
 
+    # Index for role-based lookups (admin checks, role statistics)
+    __table_args__ = (
+        db.Index('idx_users_role', 'role'),
+    )
+
     # Relations
     files = db.relationship("File", backref="owner", lazy=True, cascade="all, delete-orphan")
     folders = db.relationship("Folder", backref="owner", lazy=True, cascade="all, delete-orphan")
@@ -23,6 +23,9 @@ class ActivityType(Enum):
     SEARCH = "search"
     DEMO_ACTION = "demo_action"
 
+# Action values accepted by the activity log, built once for O(1) validation
+VALID_ACTIVITY_ACTIONS = frozenset(activity_type.value for activity_type in ActivityType)
+
 class UserActivity(db.Model):
     __tablename__ = "user_activities"
 
@@ -41,7 +44,8 @@ class UserActivity(db.Model):
         db.Index('idx_user_activities_user_id', 'user_id'),
         db.Index('idx_user_activities_created_at', 'created_at'),
         db.Index('idx_user_activities_action', 'action'),
-        db.Index('idx_user_activities_user_period', 'user_id', 'created_at'),
+        # Serves per-user period filters and keyset pagination on (created_at, id)
+        db.Index('idx_user_activities_user_created_id', 'user_id', 'created_at', 'id'),
     )
 
     # Relationship
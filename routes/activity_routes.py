@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.activity_logger import ActivityLogger, ActivityLogError
-from models.user_activity import ActivityType, UserActivity
+from models.user_activity import ActivityType, UserActivity, VALID_ACTIVITY_ACTIONS
 from models.access_log import AccessLog
 from models.user import User
 from extensions import db
@@ -16,7 +16,7 @@ def handle_activity_log_error(error):
     return jsonify({
         'error': error.message,
         'code': error.code,
-        'timestamp': ActivityLogger().db.func.now()
+        'timestamp': datetime.now(timezone.utc).isoformat()
     }), error.status_code
 
 @activity_bp.route('/activities', methods=['GET'])
@@ -27,6 +27,7 @@ def get_user_activities():
     
     Query parameters:
     - page: Page number (default: 1)
+    - cursor: next_cursor of the previous page (keyset pagination, replaces page)
     - limit: Items per page (default: 20, max: 100)
     - period: Period filter ('today', 'week', 'month', 'custom')
     - date: Custom date for period filter (YYYY-MM-DD)
@@ -108,7 +109,8 @@ def get_user_activities():
             user_id=current_user_id,
             filters=filters,
             page=page,
-            limit=limit
+            limit=limit,
+            cursor=request.args.get('cursor')
         )
         
         return jsonify(result)
@@ -317,14 +319,12 @@ def log_activity():
             return jsonify({'error': 'Action is required'}), 400
         
         # Validate action type
-        valid_actions = [activity_type.value for activity_type in ActivityType]
-        print(f"Valid actions: {valid_actions}")
         print(f"Received action: {data['action']}")
         
-        if data['action'] not in valid_actions:
+        if data['action'] not in VALID_ACTIVITY_ACTIONS:
             return jsonify({
                 'error': 'Invalid action type',
-                'valid_actions': valid_actions
+                'valid_actions': [activity_type.value for activity_type in ActivityType]
             }), 400
         
         activity = activity_logger.log_activity(
@@ -382,6 +382,9 @@ def log_activities_batch():
     """
     Log multiple activities in batch
     
+    Each entry is reported on its own: entries with a missing or invalid action,
+    or rejected by the database, are listed in "errors" and the others are logged.
+    
     Request body:
     {
         "activities": [
@@ -411,32 +414,34 @@ def log_activities_batch():
                 'code': 'INVALID_ACTIVITIES_FORMAT'
             }), 400
         
-        # Validate action types
-        valid_actions = [activity_type.value for activity_type in ActivityType]
-        logged_activities = []
+        valid_activities = []
+        valid_indices = []
         errors = []
         
         for i, activity_data in enumerate(activities):
             if not isinstance(activity_data, dict) or 'action' not in activity_data:
-                errors.append(f"Activity {i}: Missing action field")
+                errors.append((i, "Missing action field"))
                 continue
             
-            if activity_data['action'] not in valid_actions:
-                errors.append(f"Activity {i}: Invalid action type '{activity_data['action']}'")
+            if not isinstance(activity_data['action'], str) or activity_data['action'] not in VALID_ACTIVITY_ACTIONS:
+                errors.append((i, f"Invalid action type '{activity_data['action']}'"))
                 continue
             
-            try:
-                activity = activity_logger.log_activity(
-                    user_id=current_user_id,
-                    action=activity_data['action'],
-                    resource=activity_data.get('resource'),
-                    details=activity_data.get('details', {}),
-                    success=activity_data.get('success', True)
-                )
-                logged_activities.append(activity.to_dict())
-            except Exception as e:
-                errors.append(f"Activity {i}: {str(e)}")
-                continue
+            valid_indices.append(i)
+            valid_activities.append({
+                'action': activity_data['action'],
+                'resource': activity_data.get('resource'),
+                'details': activity_data.get('details', {}),
+                'success': activity_data.get('success', True)
+            })
+        
+        # Toutes les activités valides sont insérées en une seule transaction ;
+        # celles refusées par la base sont rapportées individuellement
+        logged_activities, failed = activity_logger.log_activities_bulk(
+            user_id=current_user_id,
+            activities=valid_activities
+        )
+        errors.extend((valid_indices[position], message) for position, message in failed)
         
         response_data = {
             'message': f'Successfully logged {len(logged_activities)} activities',
@@ -445,7 +450,7 @@ def log_activities_batch():
         }
         
         if errors:
-            response_data['errors'] = errors
+            response_data['errors'] = [f"Activity {i}: {message}" for i, message in sorted(errors)]
         
         return jsonify(response_data), 201
 
@@ -450,69 +450,55 @@ def _get_filtered_stats():
     ).count()
     
     # Obtenir les IDs des dossiers à exclure (y compris leurs sous-dossiers)
-    excluded_folder_ids = []
-    for folder_name in excluded_folders:
-        excluded_root = Folder.query.filter_by(name=folder_name).all()
-        for root in excluded_root:
-            excluded_folder_ids.append(root.id)
-            # Ajouter tous les sous-dossiers récursivement
-            excluded_folder_ids.extend(_get_all_subfolder_ids(root.id))
+    excluded_folder_ids = _get_folder_tree_ids(excluded_folders)
     
-    # Compter les fichiers en excluant ceux dans #recycle et #recycler
-    # et les fichiers supprimés (is_deleted=True)
-    total_files_query = File.query
+    # Compter les fichiers et sommer leur taille en une seule requête,
+    # en excluant ceux dans #recycle et #recycler et les fichiers supprimés
+    files_query = db.session.query(
+        db.func.count(File.id),
+        db.func.coalesce(db.func.sum(File.size_kb), 0)
+    )
     
     # Exclure les fichiers dans les dossiers exclus
     if excluded_folder_ids:
-        total_files_query = total_files_query.filter(
-            ~File.folder_id.in_(excluded_folder_ids)
-        )
+        files_query = files_query.filter(~File.folder_id.in_(excluded_folder_ids))
     
     # Exclure les fichiers supprimés si le champ existe
     if hasattr(File, 'is_deleted'):
-        total_files_query = total_files_query.filter(
+        files_query = files_query.filter(
             (File.is_deleted == False) | (File.is_deleted == None)
         )
     
-    total_files = total_files_query.count()
-    
-    # Calculer la taille totale utilisée en excluant les dossiers #recycle et #recycler
-    total_size_kb = 0
-    size_query = db.session.query(db.func.sum(File.size_kb))
-    
-    if excluded_folder_ids:
-        size_query = size_query.filter(~File.folder_id.in_(excluded_folder_ids))
-    
-    if hasattr(File, 'is_deleted'):
-        size_query = size_query.filter(
-            (File.is_deleted == False) | (File.is_deleted == None)
-        )
+    total_files, total_size_kb = files_query.one()
     
-    result = size_query.scalar()
-    total_size_kb = result if result else 0
+    # Compteurs utilisateurs/groupes indépendants regroupés en un seul aller-retour
+    total_users, admin_users, simple_users, total_groups = db.session.query(
+        db.func.count(User.id),
+        db.func.count(db.case((User.role == 'ADMIN', 1))),
+        db.func.count(db.case((User.role == 'SIMPLE_USER', 1))),
+        db.select(db.func.count(Group.id)).scalar_subquery()
+    ).one()
     
     return {
-        'total_users': User.query.count(),
-        'total_groups': Group.query.count(),
+        'total_users': total_users,
+        'total_groups': total_groups,
         'total_folders': total_folders,
         'total_files': total_files,
         'total_size_kb': total_size_kb,
         'total_size_bytes': total_size_kb * 1024,
-        'admin_users': User.query.filter_by(role='ADMIN').count(),
-        'simple_users': User.query.filter_by(role='SIMPLE_USER').count()
+        'admin_users': admin_users,
+        'simple_users': simple_users
     }
 
-def _get_all_subfolder_ids(parent_id):
-    """Récupérer récursivement tous les IDs des sous-dossiers"""
-    subfolder_ids = []
-    subfolders = Folder.query.filter_by(parent_id=parent_id).all()
-    
-    for subfolder in subfolders:
-        subfolder_ids.append(subfolder.id)
-        # Récursion pour les sous-dossiers
-        subfolder_ids.extend(_get_all_subfolder_ids(subfolder.id))
-    
-    return subfolder_ids
+def _get_folder_tree_ids(root_names):
+    """Récupérer en une requête récursive les IDs des dossiers nommés et de tous leurs sous-dossiers"""
+    folder_tree = db.select(Folder.id).where(
+        Folder.name.in_(root_names)
+    ).cte('folder_tree', recursive=True)
+    folder_tree = folder_tree.union(
+        db.select(Folder.id).where(Folder.parent_id == folder_tree.c.id)
+    )
+    return db.session.scalars(db.select(folder_tree.c.id)).all()
 
 @admin_bp.route('/sync-nas', methods=['POST'])
 @admin_required
@@ -1,12 +1,58 @@
 # routes/auth_routes.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models.user import User
 from extensions import db
 from flask_jwt_extended import create_access_token
+from services.permission_optimizer import permission_optimizer
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 auth_bp = Blueprint("auth", __name__)
 
+# Pré-chauffer le cache de permissions à la connexion (désactivable)
+WARM_PERMISSION_CACHE_ON_LOGIN = os.getenv("PERMISSION_CACHE_WARM_ON_LOGIN", "true").lower() == "true"
+
+# Pool borné : une rafale de connexions ne crée pas un thread par login
+_warm_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PERMISSION_CACHE_WARM_WORKERS", "2")),
+    thread_name_prefix="permission-cache-warm"
+)
+# Utilisateurs dont le préchauffage est en cours ou en attente dans le pool
+_warming_user_ids = set()
+_warming_lock = threading.Lock()
+
+def _warm_permission_cache_in_background(user_id):
+    """Préchauffe le cache de permissions dans le pool, hors du chemin de la réponse de login"""
+    # Un seul préchauffage à la fois par utilisateur : deux connexions rapprochées
+    # inséreraient les mêmes entrées de cache (contrainte uq_user_resource_perm)
+    with _warming_lock:
+        if user_id in _warming_user_ids:
+            return
+        _warming_user_ids.add(user_id)
+
+    app = current_app._get_current_object()
+
+    def warm():
+        try:
+            with app.app_context():
+                try:
+                    permission_optimizer.warm_cache_for_user(user_id)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Warning: Failed to warm permission cache for user {user_id}: {e}")
+        finally:
+            with _warming_lock:
+                _warming_user_ids.discard(user_id)
+
+    try:
+        _warm_executor.submit(warm)
+    except RuntimeError:
+        # Pool arrêté (fin du processus) : rien à préchauffer
+        with _warming_lock:
+            _warming_user_ids.discard(user_id)
+
 @auth_bp.route("/login", methods=["POST"])
 def login():
     data = request.get_json(silent=True)
@@ -25,6 +71,12 @@ def login():
     if user and user.check_password(password):
         additional_claims = {"role": user.role.upper()}
         access_token = create_access_token(identity=str(user.id), additional_claims=additional_claims)
+
+        # Les admins contournent les permissions : inutile de chauffer leur cache
+        # Le préchauffage tourne en parallèle : la réponse n'attend pas ses requêtes
+        if WARM_PERMISSION_CACHE_ON_LOGIN and user.role.upper() != "ADMIN":
+            _warm_permission_cache_in_background(user.id)
+
         return jsonify({
             "access_token": access_token,
             "user": {
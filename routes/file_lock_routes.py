@@ -59,38 +59,32 @@ def acquire_lock():
             lock_duration_minutes=lock_duration_minutes
         )
         
+        # One owner lookup for both outcomes (on conflict the model has already
+        # loaded this user, so the session identity map answers it)
+        user = User.query.get(lock.user_id)
+        lock_data = {
+            'id': lock.id,
+            'file_path': lock.file_path,
+            'locked_by_user_id': lock.user_id,
+            'locked_by_username': user.username if user else 'Unknown',
+            'locked_at': lock.locked_at.isoformat(),
+            'expires_at': lock.expires_at.isoformat(),
+            'session_id': lock.session_id,
+            'is_active': lock.is_active
+        }
+        
         if success:
-            user = User.query.get(lock.user_id)
             return jsonify({
                 'success': True,
                 'message': message,
-                'lock': {
-                    'id': lock.id,
-                    'file_path': lock.file_path,
-                    'locked_by_user_id': lock.user_id,
-                    'locked_by_username': user.username if user else 'Unknown',
-                    'locked_at': lock.locked_at.isoformat(),
-                    'expires_at': lock.expires_at.isoformat(),
-                    'session_id': lock.session_id,
-                    'is_active': lock.is_active
-                }
+                'lock': lock_data
             }), 200
         else:
             # Lock failed - file is locked by another user
-            user = User.query.get(lock.user_id)
             return jsonify({
                 'success': False,
                 'message': message,
-                'lock': {
-                    'id': lock.id,
-                    'file_path': lock.file_path,
-                    'locked_by_user_id': lock.user_id,
-                    'locked_by_username': user.username if user else 'Unknown',
-                    'locked_at': lock.locked_at.isoformat(),
-                    'expires_at': lock.expires_at.isoformat(),
-                    'session_id': lock.session_id,
-                    'is_active': lock.is_active
-                }
+                'lock': lock_data
             }), 409  # Conflict
             
     except Exception as e:
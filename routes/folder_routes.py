@@ -7,15 +7,27 @@ from extensions import db
 from services.permission_optimizer import PermissionOptimizer
 from utils.nas_utils import normalize_smb_path, validate_smb_path, sanitize_filename
 from utils.smb_client import SMBClientNAS
+import threading
 
 folder_bp = Blueprint('folder_bp', __name__, url_prefix='/folders')
 
 # Initialize permission optimizer
 permission_optimizer = PermissionOptimizer()
 
-# Instance SMB pour synchronisation
+# Instance SMB partagée pour la synchronisation : la connexion (TCP + authentification NTLM)
+# est ouverte une seule fois puis réutilisée, au lieu d'une nouvelle connexion par appel
+# (les opérations du client sont sérialisées par son propre verrou)
+_nas_client = None
+_nas_client_lock = threading.Lock()
+
 def get_nas_client():
-    return SMBClientNAS()
+    global _nas_client
+    if _nas_client is None:
+        # Double vérification : deux requêtes simultanées ne créent qu'un seul client
+        with _nas_client_lock:
+            if _nas_client is None:
+                _nas_client = SMBClientNAS()
+    return _nas_client
 
 def sync_folder_with_nas(folder, nas_client=None):
     """Synchronise un dossier DB avec le NAS"""
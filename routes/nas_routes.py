@@ -11,7 +11,12 @@ from smb.SMBConnection import SMBConnection
 from dotenv import load_dotenv
 import os
 import io
+import socket
+import threading
+import time
 import uuid
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 
 from models.user import User
 from models.folder import Folder
@@ -27,6 +32,7 @@ from utils.nas_utils import (
     format_smb_file_info
 )
 from utils.permissions import PermissionSet
+from utils.request_cache import get_permission_memo
 from services.permission_optimizer import PermissionOptimizer
 from services.nas_sync_service import nas_sync_service
 from utils.access_logger import log_file_operation
@@ -38,6 +44,27 @@ nas_bp = Blueprint('nas', __name__, url_prefix='/nas')
 
 # ================== CONNEXION SMB GLOBALE ==================
 
+# Délai max de la sonde ECHO qui vérifie la connexion SMB persistante
+SMB_ECHO_TIMEOUT_SECONDS = int(os.getenv('SMB_ECHO_TIMEOUT_SECONDS', '5'))
+# Délai max de la sonde TCP faite avant chaque tentative SMB : un port injoignable
+# échoue en une fraction de seconde au lieu du délai de connexion pysmb (60 s)
+SMB_CONNECT_PROBE_TIMEOUT_SECONDS = float(os.getenv('SMB_CONNECT_PROBE_TIMEOUT_SECONDS', '1'))
+# Inactivité (s) au-delà de laquelle la connexion est vérifiée par un ECHO avant usage ;
+# une connexion utilisée plus récemment est supposée vivante
+SMB_IDLE_CHECK_SECONDS = float(os.getenv('SMB_IDLE_CHECK_SECONDS', '30'))
+
+def _serialize_smb(method):
+    """Exécute la méthode sous le verrou du client : les threads de requête partagent
+    une seule connexion SMB, un seul échange doit donc circuler à la fois sur le socket"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._last_used = time.monotonic()
+    return wrapper
+
 class GlobalSMBClient:
     """Client SMB global avec connexion persistante"""
     
@@ -55,12 +82,48 @@ class GlobalSMBClient:
         self.conn = None
         self._is_connected = False
         self._last_connect_attempt = None
+        self._last_used = 0.0
+        # Réentrant : certaines opérations en appellent d'autres (upload_file -> list_files)
+        self._lock = threading.RLock()
         self._connect()
 
+    def _open_connection(self, port, use_ntlm_v2, is_direct_tcp):
+        """Ouvre une nouvelle connexion SMB et la marque active si elle réussit"""
+        self.conn = SMBConnection(
+            self.username,
+            self.password,
+            self.client_name,
+            self.server_name,
+            domain=self.domain_name,
+            use_ntlm_v2=use_ntlm_v2,
+            is_direct_tcp=is_direct_tcp
+        )
+        if self.conn.connect(self.server_ip, port):
+            self._is_connected = True
+            self._last_used = time.monotonic()
+            return True
+        return False
+
+    def _port_reachable(self, port):
+        """Sonde TCP rapide (connexion seule, sans négociation SMB) du port du NAS"""
+        try:
+            with socket.create_connection((self.server_ip, port), timeout=SMB_CONNECT_PROBE_TIMEOUT_SECONDS):
+                return True
+        except OSError:
+            return False
+
+    def _close_connection(self):
+        """Ferme la connexion courante (libère le socket) avant d'en ouvrir une autre"""
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self._is_connected = False
+
     def _connect(self):
         """Établit la connexion SMB une seule fois"""
         try:
-            import time
             # Throttle des tentatives de connexion pour éviter les boucles rapides
             if self._last_connect_attempt and (time.time() - self._last_connect_attempt) < 0.5:
                 print("⏱️ Reconnexion tentée trop rapidement, attente courte")
@@ -69,67 +132,45 @@ class GlobalSMBClient:
 
             if self._is_connected and self.conn:
                 return True
+
+            self._close_connection()
+
+            # Sonder chaque port une seule fois, et 139 uniquement si 445 n'a pas abouti :
+            # les tentatives sur un port fermé sont sautées
+            port_445_open = self._port_reachable(445)
             
             # Essayer différentes configurations SMB
             # Tentative 1: TCP direct sur port 445 (préférer si possible)
-            try:
-                self.conn = SMBConnection(
-                    self.username,
-                    self.password,
-                    self.client_name,
-                    self.server_name,
-                    domain=self.domain_name,
-                    use_ntlm_v2=True,
-                    is_direct_tcp=True
-                )
-                if self.conn.connect(self.server_ip, 445):
-                    print(f"✅ Connexion SMB TCP directe réussie sur port 445")
-                    return True
-            except Exception as e2:
-                print(f"❌ Échec TCP direct port 445: {str(e2)}")
+            if port_445_open:
+                try:
+                    if self._open_connection(445, use_ntlm_v2=True, is_direct_tcp=True):
+                        print(f"✅ Connexion SMB TCP directe réussie sur port 445")
+                        return True
+                except Exception as e2:
+                    print(f"❌ Échec TCP direct port 445: {str(e2)}")
 
-            # Tentative 2: NetBIOS sur port 139
-            try:
-                self.conn = SMBConnection(
-                    self.username,
-                    self.password,
-                    self.client_name,
-                    self.server_name,
-                    domain=self.domain_name,
-                    use_ntlm_v2=True,
-                    is_direct_tcp=False
-                )
-                if self.conn.connect(self.server_ip, 139):
-                    print(f"✅ Connexion SMB NetBIOS réussie sur port 139")
-                    return True
-            except Exception as e1:
-                print(f"❌ Échec NetBIOS port 139: {str(e1)}")
+            port_139_open = self._port_reachable(139)
+            if not (port_445_open or port_139_open):
+                raise Exception(f"NAS injoignable ({self.server_ip}: ports 445 et 139 fermés)")
 
-            # Tentative 3: NTLM v1 en fallback
-            try:
-                self.conn = SMBConnection(
-                    self.username,
-                    self.password,
-                    self.client_name,
-                    self.server_name,
-                    domain=self.domain_name,
-                    use_ntlm_v2=False,
-                    is_direct_tcp=False
-                )
-                if self.conn.connect(self.server_ip, 139):
-                    print(f"✅ Connexion SMB NTLM v1 réussie sur port 139")
-                    return True
-            except Exception as e3:
-                print(f"❌ Échec NTLM v1: {str(e3)}")
+            if port_139_open:
+                # Tentative 2: NetBIOS sur port 139
+                try:
+                    if self._open_connection(139, use_ntlm_v2=True, is_direct_tcp=False):
+                        print(f"✅ Connexion SMB NetBIOS réussie sur port 139")
+                        return True
+                except Exception as e1:
+                    print(f"❌ Échec NetBIOS port 139: {str(e1)}")
+
+                # Tentative 3: NTLM v1 en fallback
+                try:
+                    if self._open_connection(139, use_ntlm_v2=False, is_direct_tcp=False):
+                        print(f"✅ Connexion SMB NTLM v1 réussie sur port 139")
+                        return True
+                except Exception as e3:
+                    print(f"❌ Échec NTLM v1: {str(e3)}")
             
             raise Exception("Toutes les configurations SMB ont échoué")
-            
-            if self.conn.connect(self.server_ip, self.port):
-                self._is_connected = True
-                print(f"✅ Connexion SMB établie vers {self.server_ip}:{self.port}")
-                return True
-            else:
-                raise Exception("Échec de connexion SMB")
                 
         except Exception as e:
             self._is_connected = False
@@ -137,18 +178,29 @@ class GlobalSMBClient:
             raise
 
     def _ensure_connected(self):
-        """S'assure que la connexion est active, reconnecte si nécessaire"""
-        import time
-        # Avoid reconnect spamming during rapid requests (e.g. many OPTIONS from the frontend)
-        if not self._is_connected or not self.conn:
-            # If we attempted a connect very recently, skip immediate reconnect (will be retried shortly)
-            if self._last_connect_attempt and (time.time() - self._last_connect_attempt) < 0.2:
-                # Quietly return false; caller should handle empty results gracefully
-                return False
-            print("🔄 Reconnexion SMB nécessaire...")
-            return self._connect()
-        return True
+        """S'assure que la connexion est active, reconnecte si nécessaire (appelé sous self._lock)"""
+        # Connexion persistante : un simple ECHO (un aller-retour) vérifie qu'elle est
+        # toujours vivante, au lieu de renégocier TCP + authentification ; il n'est envoyé
+        # qu'après une période d'inactivité, pendant laquelle le serveur a pu la fermer
+        if self._is_connected and self.conn:
+            if time.monotonic() - self._last_used < SMB_IDLE_CHECK_SECONDS:
+                return True
+            try:
+                self.conn.echo(b'ping', timeout=SMB_ECHO_TIMEOUT_SECONDS)
+                return True
+            except Exception as e:
+                print(f"⚠️ Connexion SMB perdue ({str(e)}), reconnexion...")
+                self._close_connection()
 
+        # Avoid reconnect spamming during rapid requests (e.g. many OPTIONS from the frontend)
+        # If we attempted a connect very recently, skip immediate reconnect (will be retried shortly)
+        if self._last_connect_attempt and (time.time() - self._last_connect_attempt) < 0.2:
+            # Quietly return false; caller should handle empty results gracefully
+            return False
+        print("🔄 Reconnexion SMB nécessaire...")
+        return self._connect()
+
+    @_serialize_smb
     def list_files(self, path="/"):
         """Liste les fichiers et dossiers avec fallback"""
         self._ensure_connected()
@@ -196,6 +248,7 @@ class GlobalSMBClient:
                 # pour permettre à la recherche récursive de continuer ailleurs.
                 return []
 
+    @_serialize_smb
     def create_folder(self, path, folder_name):
         """Crée un dossier"""
         self._ensure_connected()
@@ -213,6 +266,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de créer le dossier {folder_name}: {str(e)}")
 
+    @_serialize_smb
     def create_file(self, path, file_name):
         """Crée un fichier vide"""
         self._ensure_connected()
@@ -234,6 +288,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de créer le fichier {file_name}: {str(e)}")
 
+    @_serialize_smb
     def upload_file(self, file_obj, dest_path, filename, overwrite=False):
         """Upload un fichier"""
         self._ensure_connected()
@@ -273,6 +328,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible d'uploader {filename}: {str(e)}")
 
+    @_serialize_smb
     def download_file(self, file_path):
         """Télécharge un fichier"""
         self._ensure_connected()
@@ -285,6 +341,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de télécharger {file_path}: {str(e)}")
 
+    @_serialize_smb
     def delete_file(self, path):
         """Supprime un fichier ou dossier"""
         self._ensure_connected()
@@ -312,9 +369,15 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de supprimer {path}: {str(e)}")
 
-    def delete_file_recursive(self, path):
+    @_serialize_smb
+    def delete_file_recursive(self, path, _deleted_log=None):
         """Supprime un fichier ou dossier récursivement (pour les administrateurs)"""
-        self._ensure_connected()
+        # Les messages par élément sont regroupés et écrits en une seule fois à la fin,
+        # plutôt qu'un print par fichier supprimé
+        is_root_call = _deleted_log is None
+        if is_root_call:
+            _deleted_log = []
+            self._ensure_connected()
         
         try:
             # Vérifier si c'est un dossier ou un fichier
@@ -329,27 +392,31 @@ class GlobalSMBClient:
                             item_path = f"{path.rstrip('/')}/{item.filename}"
                             if item.isDirectory:
                                 # Récursion pour les sous-dossiers
-                                self.delete_file_recursive(item_path)
+                                self.delete_file_recursive(item_path, _deleted_log)
                             else:
                                 # Supprimer le fichier
                                 self.conn.deleteFiles(self.shared_folder, item_path)
-                                print(f"✅ Fichier supprimé: {item_path}")
+                                _deleted_log.append(f"✅ Fichier supprimé: {item_path}")
                 except Exception as list_error:
-                    print(f"⚠️ Erreur listage contenu {path}: {str(list_error)}")
+                    _deleted_log.append(f"⚠️ Erreur listage contenu {path}: {str(list_error)}")
                 
                 # Supprimer le dossier maintenant qu'il est vide
                 self.conn.deleteDirectory(self.shared_folder, path)
-                print(f"✅ Dossier supprimé: {path}")
+                _deleted_log.append(f"✅ Dossier supprimé: {path}")
             else:
                 # C'est un fichier, le supprimer directement
                 self.conn.deleteFiles(self.shared_folder, path)
-                print(f"✅ Fichier supprimé: {path}")
+                _deleted_log.append(f"✅ Fichier supprimé: {path}")
             
             return {"success": True, "message": "Suppression récursive réussie"}
             
         except Exception as e:
             raise Exception(f"Impossible de supprimer récursivement {path}: {str(e)}")
+        finally:
+            if is_root_call and _deleted_log:
+                print("\n".join(_deleted_log))
 
+    @_serialize_smb
     def rename_file(self, old_path, new_name):
         """Renomme un fichier ou dossier"""
         self._ensure_connected()
@@ -369,6 +436,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de renommer {old_path}: {str(e)}")
 
+    @_serialize_smb
     def move_file(self, source_path, dest_path):
         """Déplace un fichier ou dossier"""
         self._ensure_connected()
@@ -387,6 +455,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible de déplacer {source_path}: {str(e)}")
 
+    @_serialize_smb
     def get_file_info(self, file_path):
         """Obtient les informations d'un fichier"""
         self._ensure_connected()
@@ -407,6 +476,7 @@ class GlobalSMBClient:
         except Exception as e:
             raise Exception(f"Impossible d'obtenir les infos de {file_path}: {str(e)}")
 
+    @_serialize_smb
     def test_connection(self):
         """Teste la connexion SMB"""
         try:
@@ -432,12 +502,16 @@ class GlobalSMBClient:
 
 # Instance SMB globale
 _global_smb_client = None
+_global_smb_client_lock = threading.Lock()
 
 def get_smb_client():
     """Retourne l'instance SMB globale (singleton)"""
     global _global_smb_client
     if _global_smb_client is None:
-        _global_smb_client = GlobalSMBClient()
+        # Double vérification : deux requêtes simultanées ne créent qu'un seul client
+        with _global_smb_client_lock:
+            if _global_smb_client is None:
+                _global_smb_client = GlobalSMBClient()
     return _global_smb_client
 
 # Instance pour l'optimisation des permissions
@@ -448,6 +522,9 @@ _copy_operations = {}
 
 # ================== GESTION DES PERMISSIONS ==================
 
+# Actions reconnues par check_folder_permission
+FOLDER_PERMISSION_ACTIONS = frozenset({'read', 'write', 'delete', 'share'})
+
 def check_file_permission(user, file_path, required_action='read'):
     """
     Vérifie les permissions d'un utilisateur sur un fichier spécifique
@@ -510,9 +587,12 @@ def get_all_accessible_folders(user):
         # Récupérer tous les dossiers de la base de données
         all_folders = Folder.query.all()
         
+        # Charger les permissions de tous les dossiers en une seule requête groupée
+        permissions = permission_optimizer.get_bulk_folder_permissions(
+            user.id, [folder.id for folder in all_folders]
+        )
+        
         for folder in all_folders:
-            # Vérifier les permissions directes
-            permissions = permission_optimizer.get_bulk_folder_permissions(user.id, [folder.id])
             folder_perm = permissions.get(folder.id)
             
             if folder_perm and folder_perm.can_read:
@@ -552,6 +632,48 @@ def ensure_root_access(user):
         print(f"Erreur vérification accès racine pour {user.username}: {str(e)}")
         return False
 
+def _resolve_folder_path_permission(user, normalized_path):
+    """
+    Résout la permission effective d'un utilisateur sur un chemin : dossier exact,
+    sinon dossiers parents, sinon dossier racine.
+    Le résultat est mémorisé pour la requête courante, afin que la vérification de
+    plusieurs actions (ou de plusieurs éléments d'un même dossier) ne refasse pas le parcours.
+    Retourne un objet exposant can_read/can_write/can_delete/can_share, ou None.
+    """
+    memo = get_permission_memo()
+    memo_key = ('folder_path', user.id, normalized_path)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    permission = None
+
+    # Chercher le dossier correspondant dans la DB
+    folder = Folder.query.filter_by(path=normalized_path).first()
+    if folder:
+        permission = permission_optimizer.get_bulk_folder_permissions(user.id, [folder.id]).get(folder.id)
+
+    if not permission:
+        # Si pas de dossier exact, chercher récursivement dans les parents
+        parent_path = get_parent_path(normalized_path)
+        if parent_path != normalized_path and parent_path != '/':
+            permission = _resolve_folder_path_permission(user, parent_path)
+        else:
+            # Vérifier s'il y a un dossier racine défini
+            root_folder = Folder.query.filter_by(path='/').first()
+            if root_folder:
+                permission = permission_optimizer.get_bulk_folder_permissions(
+                    user.id, [root_folder.id]
+                ).get(root_folder.id)
+
+            # Par défaut, autoriser la lecture pour les utilisateurs authentifiés sur la racine
+            # mais refuser pour les autres actions ou chemins spécifiques
+            if not permission and normalized_path == '/':
+                permission = PermissionSet(can_read=True, source='default')
+
+    if memo is not None:
+        memo[memo_key] = permission
+    return permission
+
 def check_folder_permission(user, path, required_action='read'):
     """
     Vérifie les permissions d'un utilisateur sur un chemin via la base de données
@@ -561,50 +683,17 @@ def check_folder_permission(user, path, required_action='read'):
     if user and user.role and user.role.upper() in ['ADMIN', 'ADMINISTRATOR']:
         return True
 
+    # Action inconnue : refuser avant toute requête en base
+    if required_action not in FOLDER_PERMISSION_ACTIONS:
+        return False
+
     normalized_path = normalize_smb_path(path)
     
     try:
-        # Chercher le dossier correspondant dans la DB
-        folder = Folder.query.filter_by(path=normalized_path).first()
-        if folder:
-            permissions = permission_optimizer.get_bulk_folder_permissions(user.id, [folder.id])
-            folder_perm = permissions.get(folder.id)
-            
-            if folder_perm:
-                if required_action == 'read':
-                    return folder_perm.can_read
-                elif required_action == 'write':
-                    return folder_perm.can_write
-                elif required_action == 'delete':
-                    return folder_perm.can_delete
-                elif required_action == 'share':
-                    return folder_perm.can_share
-        
-        # Si pas de dossier exact, chercher récursivement dans les parents
-        parent_path = get_parent_path(normalized_path)
-        if parent_path != normalized_path and parent_path != '/':
-            return check_folder_permission(user, parent_path, required_action)
-        
-        # Vérifier s'il y a un dossier racine défini
-        root_folder = Folder.query.filter_by(path='/').first()
-        if root_folder:
-            permissions = permission_optimizer.get_bulk_folder_permissions(user.id, [root_folder.id])
-            root_perm = permissions.get(root_folder.id)
-            if root_perm:
-                if required_action == 'read':
-                    return root_perm.can_read
-                elif required_action == 'write':
-                    return root_perm.can_write
-                elif required_action == 'delete':
-                    return root_perm.can_delete
-                elif required_action == 'share':
-                    return root_perm.can_share
-        
-        # Par défaut, autoriser la lecture pour les utilisateurs authentifiés sur la racine
-        # mais refuser pour les autres actions ou chemins spécifiques
-        if normalized_path == '/' and required_action == 'read':
-            return True
-        return False
+        permission = _resolve_folder_path_permission(user, normalized_path)
+        if permission is None:
+            return False
+        return getattr(permission, f'can_{required_action}')
         
     except Exception as e:
         print(f"Erreur vérification permission {required_action} pour {user.username} sur {path}: {str(e)}")
@@ -1114,31 +1203,35 @@ def test_connection():
     if not user or user.role.upper() != 'ADMIN':
         return jsonify({"error": "Accès réservé aux administrateurs"}), 403
     
-    try:
-        results = {}
-        
-        # Test SMB connection
+    def test_smb():
         try:
-            smb_client = get_smb_client()
-            smb_result = smb_client.test_connection()
-            results["smb"] = smb_result
+            return get_smb_client().test_connection()
         except Exception as e:
-            results["smb"] = {
+            return {
                 "success": False,
                 "error": f"SMB connection failed: {str(e)}"
             }
-        
-        # Test Synology API connection
+
+    def test_synology():
         try:
             from services.synology_service import get_synology_service
-            synology_service = get_synology_service()
-            synology_result = synology_service.test_connection()
-            results["synology"] = synology_result
+            return get_synology_service().test_connection()
         except Exception as e:
-            results["synology"] = {
+            return {
                 "success": False,
                 "error": f"Synology API connection failed: {str(e)}"
             }
+
+    try:
+        # Les deux tests sont indépendants : les lancer en parallèle pour
+        # ne payer que le plus lent des deux délais réseau
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            smb_future = executor.submit(test_smb)
+            synology_future = executor.submit(test_synology)
+            results = {
+                "smb": smb_future.result(),
+                "synology": synology_future.result()
+            }
         
         # Overall success if at least one connection works
         overall_success = results.get("smb", {}).get("success", False) or results.get("synology", {}).get("success", False)
@@ -1774,10 +1867,10 @@ def download_file(file_path):
         
         # Logger l'activité de téléchargement avec détails
         import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         def log_download_completion():
-            end_time = time.time()
+            end_time = time.perf_counter()
             duration_ms = (end_time - start_time) * 1000
             
             permission_audit_logger.log_download_operation(
@@ -2552,8 +2645,10 @@ def debug_user_permissions(user_id):
         # Récupérer toutes les permissions de dossiers
         folder_permissions = []
         folders = Folder.query.all()
+        permissions = permission_optimizer.get_bulk_folder_permissions(
+            user.id, [folder.id for folder in folders]
+        )
         for folder in folders:
-            permissions = permission_optimizer.get_bulk_folder_permissions(user.id, [folder.id])
             folder_perm = permissions.get(folder.id)
             if folder_perm:
                 folder_permissions.append({
@@ -2750,14 +2845,15 @@ def search_files():
         smb_client = get_smb_client()
         results = []
         visited_paths = set()
-        search_start_time = datetime.now()
+        import time
+        search_start_time = time.perf_counter()
         max_search_time = 8  # Maximum 8 secondes pour plus de réactivité (augmenté pour tolérer latence SMB)
         
         def search_in_directory(current_path, depth=0):
             """Recherche récursive dans un répertoire (optimisée)"""
             # Vérifier les limites (résultats, temps) - pas de limite de profondeur
             if (len(results) >= max_results or 
-                (datetime.now() - search_start_time).total_seconds() > max_search_time):
+                time.perf_counter() - search_start_time > max_search_time):
                 return
                 
             # Éviter les boucles infinies
@@ -2818,7 +2914,7 @@ def search_files():
         search_in_directory(base_path)
         
         # Calculer le temps de recherche
-        search_time = (datetime.now() - search_start_time).total_seconds() * 1000
+        search_time = (time.perf_counter() - search_start_time) * 1000
         
         # Trier les résultats : dossiers d'abord, puis par nom
         results.sort(key=lambda x: (not x['is_directory'], x['name'].lower()))
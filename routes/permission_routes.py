@@ -11,6 +11,7 @@ from models.file_permission import FilePermission
 from models.folder_permission import FolderPermission
 from extensions import db
 from functools import wraps
+from sqlalchemy.orm import selectinload
 from utils.access_logger import (
     log_folder_permission_action, 
     log_file_permission_action, 
@@ -21,6 +22,9 @@ from services.permission_optimizer import permission_optimizer
 
 permission_bp = Blueprint('permission', __name__, url_prefix='/permissions')
 
+# Taille des lots pour le calcul des permissions effectives sur toute l'arborescence
+EFFECTIVE_PERMISSIONS_BATCH_SIZE = 500
+
 # ===================== UTILITAIRES =====================
 
 def admin_required(f):
@@ -544,20 +548,54 @@ def batch_set_permissions(entity):
         target_entity = Group.query.get_or_404(target_id)
         target_name = target_entity.name
 
-    success_count = 0
-    errors = []
+    if entity == 'folders':
+        Model, PermModel, resource_column = Folder, FolderPermission, FolderPermission.folder_id
+    else:
+        Model, PermModel, resource_column = File, FilePermission, FilePermission.file_id
+    target_column = PermModel.user_id if target_type == 'user' else PermModel.group_id
 
-    Model = Folder if entity == 'folders' else File
+    flags = {
+        'can_read': bool_from_payload(perms, 'can_read'),
+        'can_write': bool_from_payload(perms, 'can_write'),
+        'can_delete': bool_from_payload(perms, 'can_delete'),
+        'can_share': bool_from_payload(perms, 'can_share')
+    }
 
-    for item_id in ids:
-        try:
-            obj = Model.query.get(item_id)
-            if not obj:
-                continue
-            set_permission(obj, target_type, target_id, perms)
-            success_count += 1
-        except Exception as e:
-            errors.append(f"{entity[:-1]} {item_id}: {str(e)}")
+    try:
+        # Ressources existantes en une requête (les IDs inconnus sont ignorés et signalés)
+        existing_ids = db.session.scalars(db.select(Model.id).where(Model.id.in_(ids))).all()
+
+        if existing_ids:
+            # Mettre à jour en une requête les permissions déjà présentes pour la cible
+            already_set = set(db.session.scalars(
+                db.select(resource_column).where(
+                    resource_column.in_(existing_ids),
+                    target_column == target_id
+                )
+            ).all())
+            if already_set:
+                PermModel.query.filter(
+                    resource_column.in_(already_set),
+                    target_column == target_id
+                ).update(flags, synchronize_session=False)
+
+            # Créer les permissions manquantes avec un seul INSERT multi-lignes
+            new_rows = [
+                {resource_column.key: resource_id, target_column.key: target_id, **flags}
+                for resource_id in existing_ids
+                if resource_id not in already_set
+            ]
+            if new_rows:
+                db.session.execute(db.insert(PermModel), new_rows)
+
+        # Signaler individuellement les IDs ignorés faute de ressource correspondante
+        found = {str(resource_id) for resource_id in existing_ids}
+        errors = [f"{entity[:-1]} {item_id}: introuvable" for item_id in ids if str(item_id) not in found]
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": f"Erreur: {str(e)}"}), 500
+
+    success_count = len(existing_ids)
 
     try:
         # Enregistrer le log pour l'opération en lot
@@ -582,6 +620,34 @@ def batch_set_permissions(entity):
 
 # ===================== EFFECTIVES =====================
 
+def _iter_effective_permissions(model, user, *loader_options):
+    """
+    Parcourt toutes les ressources d'un modèle par lots et renvoie (ressource, permission)
+    pour celles sur lesquelles l'utilisateur a une permission effective.
+    Un seul appel get_bulk_permissions par lot, et seules les ressources accordées
+    sont chargées (avec leurs relations), ce qui borne la mémoire sur les gros volumes.
+    """
+    resource_ids = db.session.scalars(db.select(model.id).order_by(model.id)).all()
+
+    for start in range(0, len(resource_ids), EFFECTIVE_PERMISSIONS_BATCH_SIZE):
+        batch_ids = resource_ids[start:start + EFFECTIVE_PERMISSIONS_BATCH_SIZE]
+        # Les permissions sont calculées avant de charger les objets : le cache
+        # de permissions fait un commit qui expirerait les objets déjà chargés
+        permissions = model.get_bulk_permissions(user, batch_ids)
+        granted_ids = [resource_id for resource_id in batch_ids if permissions.get(resource_id)]
+        if not granted_ids:
+            continue
+
+        resources = db.session.scalars(
+            db.select(model)
+            .options(*loader_options)
+            .where(model.id.in_(granted_ids))
+            .order_by(model.id)
+        )
+        for resource in resources:
+            yield resource, permissions[resource.id]
+
+
 @permission_bp.route('/effective/<int:user_id>', methods=['GET'])
 @admin_required
 def get_user_effective_permissions(user_id):
@@ -589,38 +655,35 @@ def get_user_effective_permissions(user_id):
 
     effective = {'folders': [], 'files': []}
 
-    for folder in Folder.query.all():
-        perm = folder.get_effective_permissions(user)
-        if perm:
-            effective['folders'].append({
-                'id': folder.id,
-                'name': folder.name,
-                'owner': folder.owner.username,
-                'permission': {
-                    'can_read': perm.can_read,
-                    'can_write': perm.can_write,
-                    'can_delete': perm.can_delete,
-                    'can_share': perm.can_share,
-                    'source': 'user' if perm.user_id else 'group'
-                }
-            })
+    for folder, perm in _iter_effective_permissions(Folder, user, selectinload(Folder.owner)):
+        effective['folders'].append({
+            'id': folder.id,
+            'name': folder.name,
+            'owner': folder.owner.username,
+            'permission': {
+                'can_read': perm.can_read,
+                'can_write': perm.can_write,
+                'can_delete': perm.can_delete,
+                'can_share': perm.can_share,
+                'source': 'user' if perm.user_id else 'group'
+            }
+        })
 
-    for file in File.query.all():
-        perm = file.get_effective_permissions(user)
-        if perm:
-            effective['files'].append({
-                'id': file.id,
-                'name': file.name,
-                'owner': file.owner.username,
-                'folder_name': file.folder.name if file.folder else 'Racine',
-                'permission': {
-                    'can_read': perm.can_read,
-                    'can_write': perm.can_write,
-                    'can_delete': perm.can_delete,
-                    'can_share': perm.can_share,
-                    'source': 'user' if perm.user_id else 'group'
-                }
-            })
+    for file, perm in _iter_effective_permissions(
+            File, user, selectinload(File.owner), selectinload(File.folder)):
+        effective['files'].append({
+            'id': file.id,
+            'name': file.name,
+            'owner': file.owner.username,
+            'folder_name': file.folder.name if file.folder else 'Racine',
+            'permission': {
+                'can_read': perm.can_read,
+                'can_write': perm.can_write,
+                'can_delete': perm.can_delete,
+                'can_share': perm.can_share,
+                'source': 'user' if perm.user_id else 'group'
+            }
+        })
 
     return jsonify({
         'user': {
@@ -955,12 +1018,10 @@ def invalidate_permission_cache():
         
         if user_id:
             # Invalider le cache pour un utilisateur spécifique
-            permission_optimizer.invalidate_user_permissions(user_id)
-            invalidated_count += 1
+            invalidated_count = permission_optimizer.invalidate_user_permissions(user_id)
         elif resource_type and resource_id:
             # Invalider le cache pour une ressource spécifique
-            permission_optimizer.invalidate_resource_permissions(resource_type, resource_id)
-            invalidated_count += 1
+            invalidated_count = permission_optimizer.invalidate_resource_permissions(resource_type, resource_id)
         else:
             # Invalider tout le cache (opération générale)
             # Utiliser une méthode sûre pour invalider tout le cache
@@ -994,7 +1055,7 @@ def check_permissions_with_audit():
     Vérifier les permissions avec audit détaillé et métriques de performance
     """
     import time
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
         user_id = get_jwt_identity()
@@ -1006,7 +1067,7 @@ def check_permissions_with_audit():
         
         # Métriques de performance
         timing_data = {
-            'start_time': start_time,
+            'start_time': time.time(),
             'cache_hit': False,
             'cache_age_ms': None,
             'db_query_start': None,
@@ -1024,7 +1085,7 @@ def check_permissions_with_audit():
                 'can_modify': True
             }
             
-            end_time = time.time()
+            end_time = time.perf_counter()
             timing_data['total_duration_ms'] = (end_time - start_time) * 1000
             
             # Logger la vérification admin
@@ -1054,7 +1115,7 @@ def check_permissions_with_audit():
             }), 200
         
         # Pour les utilisateurs non-admin, vérifier les permissions via les groupes
-        timing_data['db_query_start'] = time.time()
+        timing_data['db_query_start'] = time.perf_counter()
         
         # Obtenir les groupes de l'utilisateur
         user_groups = []
@@ -1121,7 +1182,7 @@ def check_permissions_with_audit():
         effective_permissions['can_modify'] = effective_permissions['can_write']
         
         # Calculer les métriques de performance
-        end_time = time.time()
+        end_time = time.perf_counter()
         timing_data['db_query_duration_ms'] = (end_time - timing_data['db_query_start']) * 1000
         timing_data['total_duration_ms'] = (end_time - start_time) * 1000
         
@@ -1165,7 +1226,7 @@ def check_permissions_with_audit():
         }), 200
         
     except Exception as e:
-        end_time = time.time()
+        end_time = time.perf_counter()
         error_duration = (end_time - start_time) * 1000
         
         # Logger l'échec
@@ -9,7 +9,7 @@ from models.access_log import AccessLog
 from extensions import db
 from functools import wraps
 from datetime import datetime, timezone
-from utils.permission_middleware import require_resource_permission, get_user_accessible_resources, check_user_can_access_resource
+from utils.permission_middleware import require_resource_permission, get_user_accessible_resources
 from models.file_permission import FilePermission
 
 user_bp = Blueprint('user_bp', __name__, url_prefix='/users')
@@ -298,31 +298,36 @@ def _update_file_sizes_from_nas(files):
     updated_count = 0
     try:
         from routes.nas_routes import get_smb_client
+        import os
         smb_client = get_smb_client()
         
+        # Regrouper les fichiers sans taille par dossier parent : un seul listage
+        # SMB par dossier au lieu d'un listage par fichier
+        files_by_parent = {}
         for file in files:
             if file.size_kb is None or file.size_kb == 0:
-                try:
-                    # Récupérer les infos du fichier depuis le NAS
-                    nas_path = file.path or file.file_path
-                    if nas_path:
-                        # Récupérer le parent path et le filename
-                        import os
-                        parent_path = os.path.dirname(nas_path) or '/'
-                        filename = os.path.basename(nas_path)
-                        
-                        # Lister le contenu du dossier parent
-                        items = smb_client.list_files(parent_path)
-                        for item in items:
-                            if item['name'] == filename and item['size'] and item['size'] > 0:
-                                # Mettre à jour la taille en KB
-                                file.size_kb = int(item['size'] / 1024) if item['size'] > 0 else 0
-                                db.session.add(file)
-                                updated_count += 1
-                                print(f"✏️  Updated {filename}: {file.size_kb} KB")
-                                break
-                except Exception as e:
-                    print(f"⚠️  Could not fetch NAS size for {file.name}: {str(e)}")
+                nas_path = file.path or file.file_path
+                if nas_path:
+                    parent_path = os.path.dirname(nas_path) or '/'
+                    files_by_parent.setdefault(parent_path, []).append((file, os.path.basename(nas_path)))
+        
+        for parent_path, parent_files in files_by_parent.items():
+            try:
+                # Lister le contenu du dossier parent une seule fois
+                items = smb_client.list_files(parent_path)
+            except Exception as e:
+                print(f"⚠️  Could not list NAS folder {parent_path}: {str(e)}")
+                continue
+            
+            sizes = {item['name']: item['size'] for item in items}
+            
+            for file, filename in parent_files:
+                size = sizes.get(filename)
+                if size and size > 0:
+                    # Mettre à jour la taille en KB (objet déjà suivi par la session)
+                    file.size_kb = int(size / 1024)
+                    updated_count += 1
+                    print(f"✏️  Updated {filename}: {file.size_kb} KB")
         
         if updated_count > 0:
             db.session.commit()
@@ -527,6 +532,14 @@ def get_dashboard():
         'recent_activity': recent_activity
     }), 200
 
+def _load_owners(resources):
+    """Charge les propriétaires d'une liste de fichiers/dossiers en une seule requête"""
+    owner_ids = {resource.owner_id for resource in resources}
+    if not owner_ids:
+        return {}
+    return {owner.id: owner for owner in User.query.filter(User.id.in_(owner_ids)).all()}
+
+
 @user_bp.route('/accessible-resources', methods=['GET'])
 @jwt_required()
 def get_accessible_resources():
@@ -538,6 +551,7 @@ def get_accessible_resources():
         return jsonify({"msg": "Utilisateur non trouvé"}), 404
     
     resource_type = request.args.get('type', 'both')  # files, folders, both
+    # Propriétaires déjà chargés (selectinload) par get_user_accessible_resources
     accessible = get_user_accessible_resources(user, resource_type)
     
     # Formater les données de retour
@@ -652,6 +666,12 @@ def log_activity():
         print(f"Données reçues: {data}")
         return jsonify({"msg": "Erreur lors de l'enregistrement"}), 500
 
+def _can_read_with_permission(user, resource, permission):
+    """Équivalent de check_user_can_access_resource(..., 'read') avec une permission déjà chargée"""
+    if user.role == 'admin' or resource.owner_id == user.id:
+        return True
+    return bool(permission and permission.can_read)
+
 @user_bp.route('/folders/<int:folder_id>/content', methods=['GET'])
 @require_resource_permission('folder', 'read')
 def get_folder_content(folder_id):
@@ -660,15 +680,22 @@ def get_folder_content(folder_id):
     user = User.query.get(user_id)
     folder = Folder.query.get_or_404(folder_id)
     
+    # Charger les permissions de tous les enfants en lot plutôt qu'une requête par élément
+    subfolder_permissions = Folder.get_bulk_permissions(user, [child.id for child in folder.children])
+    file_permissions = File.get_bulk_permissions(user, [child.id for child in folder.files])
+
+    # Charger tous les propriétaires en une seule requête
+    owners = _load_owners(folder.children + folder.files)
+
     # Récupérer les sous-dossiers accessibles
     subfolders = []
     for subfolder in folder.children:
-        if check_user_can_access_resource(user, subfolder, 'read'):
-            permission = subfolder.get_effective_permissions(user)
+        permission = subfolder_permissions.get(subfolder.id)
+        if _can_read_with_permission(user, subfolder, permission):
             subfolders.append({
                 'id': subfolder.id,
                 'name': subfolder.name,
-                'owner': subfolder.owner.username,
+                'owner': owners[subfolder.owner_id].username,
                 'created_at': subfolder.created_at.isoformat(),
                 'is_owner': subfolder.owner_id == user.id,
                 'children_count': len(subfolder.children),
@@ -684,15 +711,15 @@ def get_folder_content(folder_id):
     # Récupérer les fichiers accessibles
     files = []
     for file in folder.files:
-        if check_user_can_access_resource(user, file, 'read'):
-            permission = file.get_effective_permissions(user)
+        permission = file_permissions.get(file.id)
+        if _can_read_with_permission(user, file, permission):
             files.append({
                 'id': file.id,
                 'name': file.name,
                 'path': file.path,
                 'size_kb': file.size_kb,
                 'size_mb': round(file.size_kb / 1024, 2),
-                'owner': file.owner.username,
+                'owner': owners[file.owner_id].username,
                 'created_at': file.created_at.isoformat(),
                 'is_owner': file.owner_id == user.id,
                 'permissions': {
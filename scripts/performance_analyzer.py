@@ -14,7 +14,8 @@ Requirements: 6.1, 6.2, 6.3
 import sys
 import os
 import json
-import time
+import timeit
+import statistics
 from typing import Dict, List, Tuple, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
@@ -28,6 +29,10 @@ from sqlalchemy import text, inspect
 from sqlalchemy.engine import Engine
 from services.performance_metrics import get_performance_metrics, MetricType
 
+# Query timing: untimed warmup executions, then timed rounds (median reported)
+QUERY_WARMUP_ROUNDS = 2
+QUERY_TIMED_ROUNDS = 5
+
 
 @dataclass
 class QueryPlan:
@@ -142,8 +147,15 @@ class PerformanceAnalyzer:
         except:
             return 0.0
     
-    def analyze_permission_queries(self) -> Dict[str, Any]:
-        """Analyze performance of permission-related queries"""
+    def analyze_permission_queries(self, query_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Analyze performance of permission-related queries.
+        
+        Args:
+            query_names: Names of the queries to run. Defaults to the comma-separated
+                         PERMISSION_BENCHMARK_ARMS environment variable, or all queries
+                         when it is unset, so CI jobs can run subsets independently.
+        """
         print("🔐 Analyzing permission query performance...")
         
         # Define critical permission queries to analyze
@@ -192,6 +204,31 @@ class PerformanceAnalyzer:
             """
         }
         
+        if query_names is None:
+            query_names = [
+                name.strip() for name in os.getenv('PERMISSION_BENCHMARK_ARMS', '').split(',')
+                if name.strip()
+            ]
+        if query_names:
+            unknown = [name for name in query_names if name not in permission_queries]
+            if unknown:
+                print(f"⚠️ Unknown permission queries ignored: {', '.join(unknown)}")
+            permission_queries = {
+                name: query for name, query in permission_queries.items() if name in query_names
+            }
+        
+        # Without seeded files/folders every plan and timing would be meaningless:
+        # check once and skip the whole benchmark instead of running it against empty tables
+        has_files, has_folders = db.session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM files), EXISTS (SELECT 1 FROM folders)"
+        )).one()
+        if not (has_files and has_folders):
+            print("⚠️ No seeded files/folders, skipping permission query analysis")
+            return {
+                query_name: {'skipped': 'no seeded files/folders', 'performance_rating': 'unknown'}
+                for query_name in permission_queries
+            }
+        
         analysis_results = {}
         
         for query_name, query in permission_queries.items():
@@ -230,13 +267,21 @@ class PerformanceAnalyzer:
         return analysis_results
     
     def _measure_query_performance(self, query: str, params: Dict) -> float:
-        """Measure actual query execution time"""
+        """
+        Measure average query execution time.
+        Uses timeit's autorange so timer overhead and GC jitter are amortized
+        over an automatically sized batch instead of a single noisy sample.
+        Warmup executions are discarded (statement compilation, plan and buffer
+        caches) and the median of several timed rounds is reported.
+        """
         try:
+            statement = text(query)
             with self.engine.connect() as conn:
-                start_time = time.perf_counter()
-                conn.execute(text(query), params)
-                end_time = time.perf_counter()
-                return (end_time - start_time) * 1000
+                timer = timeit.Timer(lambda: conn.execute(statement, params).fetchall())
+                timer.timeit(number=QUERY_WARMUP_ROUNDS)
+                number, _ = timer.autorange()
+                rounds = timer.repeat(repeat=QUERY_TIMED_ROUNDS, number=number)
+                return statistics.median(rounds) / number * 1000
         except:
             return 0.0
     
@@ -714,6 +759,12 @@ def main():
         help='Run detailed query analysis only'
     )
     
+    parser.add_argument(
+        '--queries',
+        help='Comma-separated permission queries to analyze '
+             '(default: PERMISSION_BENCHMARK_ARMS env var, or all)'
+    )
+    
     parser.add_argument(
         '--bottlenecks-only',
         action='store_true',
@@ -728,7 +779,8 @@ def main():
         if args.query_analysis:
             # Run query analysis only
             print("🔍 Running query analysis...")
-            query_performance = analyzer.analyze_permission_queries()
+            query_names = [name.strip() for name in args.queries.split(',') if name.strip()] if args.queries else None
+            query_performance = analyzer.analyze_permission_queries(query_names)
             
             print("\n📊 Query Performance Results:")
             for query_name, stats in query_performance.items():
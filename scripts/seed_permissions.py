@@ -22,16 +22,20 @@ def seed_permissions():
         actions = ["CREATE", "READ", "UPDATE", "DELETE", "MANAGE", "SHARE"]
 
         # Ensure Permission entries exist (one per resource/action)
-        created = 0
-        for resource in resources:
-            for action in actions:
-                perm = Permission.query.filter_by(resource=resource, action=action).first()
-                if not perm:
-                    perm = Permission(resource=resource, action=action)
-                    db.session.add(perm)
-                    created += 1
+        # Les entrées existantes sont chargées en une seule requête
+        permissions_by_key = {(p.resource, p.action): p for p in Permission.query.all()}
+        new_permissions = [
+            Permission(resource=resource, action=action)
+            for resource in resources
+            for action in actions
+            if (resource, action) not in permissions_by_key
+        ]
+        db.session.add_all(new_permissions)
+        db.session.flush()  # attribue les IDs sans valider la transaction
+        for perm in new_permissions:
+            permissions_by_key[(perm.resource, perm.action)] = perm
 
-        db.session.commit()
+        created = len(new_permissions)
         print(f"✅ Ensured permission table entries exist (created: {created})")
 
         # Roles we want to wire permissions for
@@ -47,27 +51,25 @@ def seed_permissions():
         }
 
         # Create RolePermission mappings
-        rp_created = 0
+        existing_mappings = set(
+            db.session.query(RolePermission.role, RolePermission.permission_id).all()
+        )
+        new_mappings = []
         for role_name, perms in roles_to_grant.items():
             if perms == "all":
-                all_perms = Permission.query.all()
-                for p in all_perms:
-                    exists = RolePermission.query.filter_by(role=role_name, permission_id=p.id).first()
-                    if not exists:
-                        rp = RolePermission(role=role_name, permission_id=p.id)
-                        db.session.add(rp)
-                        rp_created += 1
+                permission_ids = [p.id for p in permissions_by_key.values()]
             else:
-                for resource, action in perms:
-                    p = Permission.query.filter_by(resource=resource, action=action).first()
-                    if p:
-                        exists = RolePermission.query.filter_by(role=role_name, permission_id=p.id).first()
-                        if not exists:
-                            rp = RolePermission(role=role_name, permission_id=p.id)
-                            db.session.add(rp)
-                            rp_created += 1
+                permission_ids = [
+                    permissions_by_key[key].id for key in perms if key in permissions_by_key
+                ]
+            for permission_id in permission_ids:
+                if (role_name, permission_id) not in existing_mappings:
+                    existing_mappings.add((role_name, permission_id))
+                    new_mappings.append(RolePermission(role=role_name, permission_id=permission_id))
 
+        db.session.add_all(new_mappings)
         db.session.commit()
+        rp_created = len(new_mappings)
         print(f"✅ RolePermission mappings created/ensured: {rp_created}")
 
 
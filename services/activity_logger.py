@@ -1,10 +1,12 @@
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, time, timezone, timedelta
 from typing import Dict, List, Optional, Any
+import base64
+import json
 from flask import request
-from sqlalchemy import and_, desc, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, func, tuple_
+from sqlalchemy.orm import selectinload
 from extensions import db
-from models.user_activity import UserActivity, ActivityType
+from models.user_activity import UserActivity, VALID_ACTIVITY_ACTIONS
 from models.user import User
 
 class ActivityLogError(Exception):
@@ -15,6 +17,27 @@ class ActivityLogError(Exception):
         self.code = code
         super().__init__(self.message)
 
+def _parse_day(value: str) -> datetime:
+    """Parse a YYYY-MM-DD string into midnight UTC of that day (ValueError if invalid)"""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        # strptime also accepts unpadded months and days (2024-1-5)
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+def _day_bounds(moment: datetime):
+    """First and last instant of the day containing moment"""
+    return (moment.replace(hour=0, minute=0, second=0, microsecond=0),
+            moment.replace(hour=23, minute=59, second=59, microsecond=999999))
+
+# (start, end) of each relative period, computed from the current instant
+_PERIOD_RANGES = {
+    'today': _day_bounds,
+    'week': lambda now: (now - timedelta(days=7), now),
+    'month': lambda now: (now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), now),
+}
+
 class ActivityLogger:
     """Service class for logging and retrieving user activities"""
     
@@ -50,8 +73,7 @@ class ActivityLogger:
                 user_agent = request.headers.get('User-Agent')
 
             # Validate action type
-            valid_actions = [activity_type.value for activity_type in ActivityType]
-            if action not in valid_actions:
+            if action not in VALID_ACTIVITY_ACTIONS:
                 raise ActivityLogError(f"Invalid action type: {action}", 400, 'INVALID_ACTION_TYPE')
 
             # Create activity record
@@ -76,16 +98,124 @@ class ActivityLogger:
                 raise
             raise ActivityLogError(f"Failed to log activity: {str(e)}", 500, 'LOG_ACTIVITY_FAILED')
 
+    def log_activities_bulk(self, user_id: int, activities: List[Dict[str, Any]],
+                            ip_address: str = None, user_agent: str = None):
+        """
+        Log several activities of the same user in a single transaction
+        
+        All rows are inserted by one flush (batched INSERT) and one commit, instead
+        of one round trip and one commit per activity as with log_activity. If the
+        database rejects the batch (e.g. a resource longer than the column), the
+        rows are retried one by one, each in its own savepoint, so that only the
+        faulty entries are left out.
+        
+        Args:
+            user_id: ID of the user performing the actions
+            activities: List of dictionaries with action, and optionally resource,
+                details and success (same meaning as in log_activity)
+            ip_address: IP address of the user (auto-detected if not provided)
+            user_agent: User agent string (auto-detected if not provided)
+            
+        Returns:
+            Tuple (logged, errors): the created activities serialized with to_dict,
+            and (position in activities, error message) for each rejected entry
+            
+        Raises:
+            ActivityLogError: If an action is invalid or the commit fails
+        """
+        try:
+            # Auto-detect IP and user agent from request context if not provided
+            if ip_address is None and request:
+                ip_address = request.remote_addr
+            if user_agent is None and request:
+                user_agent = request.headers.get('User-Agent')
+
+            rows = []
+            for activity_data in activities:
+                action = activity_data['action']
+                if action not in VALID_ACTIVITY_ACTIONS:
+                    raise ActivityLogError(f"Invalid action type: {action}", 400, 'INVALID_ACTION_TYPE')
+                rows.append({
+                    'user_id': user_id,
+                    'action': action,
+                    'resource': activity_data.get('resource'),
+                    'details': activity_data.get('details'),
+                    'success': activity_data.get('success', True),
+                    'ip_address': ip_address,
+                    'user_agent': user_agent
+                })
+
+            if not rows:
+                return [], []
+
+            records = [UserActivity(**row) for row in rows]
+            self.db.session.add_all(records)
+            try:
+                self.db.session.flush()
+            except Exception:
+                self.db.session.rollback()
+                logged, errors = self._log_rows_individually(rows)
+            else:
+                # Serialize before commit: committing expires the records, and reading
+                # them afterwards would reload each one with its own SELECT
+                logged, errors = [record.to_dict() for record in records], []
+            self.db.session.commit()
+            
+            return logged, errors
+
+        except Exception as e:
+            self.db.session.rollback()
+            if isinstance(e, ActivityLogError):
+                raise
+            raise ActivityLogError(f"Failed to log activities: {str(e)}", 500, 'LOG_ACTIVITIES_FAILED')
+
+    def _log_rows_individually(self, rows: List[Dict[str, Any]]):
+        """Insert rows one by one in savepoints, collecting the rows the database rejects"""
+        logged = []
+        errors = []
+        for position, row in enumerate(rows):
+            record = UserActivity(**row)
+            try:
+                with self.db.session.begin_nested():
+                    self.db.session.add(record)
+            except Exception as e:
+                errors.append((position, f"Failed to log activity: {str(e)}"))
+                continue
+            logged.append(record.to_dict())
+        return logged, errors
+
+    @staticmethod
+    def _encode_cursor(activity: UserActivity) -> str:
+        """Encode the (created_at, id) position of an activity as an opaque cursor"""
+        payload = json.dumps([activity.created_at.isoformat(), activity.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """Decode a cursor produced by _encode_cursor into (created_at, id)"""
+        try:
+            created_at, activity_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), int(activity_id)
+        except (ValueError, TypeError):
+            raise ActivityLogError("Invalid pagination cursor", 400, 'INVALID_CURSOR')
+
     def get_user_activities(self, user_id: int, filters: Dict[str, Any] = None, 
-                           page: int = 1, limit: int = 20) -> Dict[str, Any]:
+                           page: int = 1, limit: int = 20,
+                           cursor: str = None) -> Dict[str, Any]:
         """
         Retrieve paginated user activities with optional filters
         
+        With a cursor (the next_cursor of a previous page), the page is read with
+        keyset pagination: only the requested rows are scanned, whatever the depth.
+        Without one, the page number is used (OFFSET); each page still returns a
+        next_cursor so clients can switch to keyset pagination.
+        
         Args:
             user_id: ID of the user
             filters: Dictionary of filters (period, action, success, etc.)
-            page: Page number (1-based)
+            page: Page number (1-based), ignored when a cursor is given
             limit: Number of items per page
+            cursor: Opaque cursor returned as next_cursor by the previous page
             
         Returns:
             Dictionary containing activities and pagination info
@@ -103,13 +233,43 @@ class ActivityLogger:
             # Apply filters
             query = self._apply_filters(query, filters)
             
-            # Order by created_at descending (most recent first)
-            query = query.order_by(desc(UserActivity.created_at))
+            # Order by created_at descending (most recent first), id breaks ties.
+            # The owner is loaded with selectinload: every row belongs to the same user,
+            # so one IN query replaces repeating the user columns on each joined row
+            query = query.order_by(desc(UserActivity.created_at), desc(UserActivity.id))
+            
+            if cursor:
+                # Keyset pagination: seek past the last row of the previous page
+                cursor_created_at, cursor_id = self._decode_cursor(cursor)
+                query = query.filter(
+                    tuple_(UserActivity.created_at, UserActivity.id) < (cursor_created_at, cursor_id)
+                )
+                # One extra row tells whether a next page exists
+                rows = query.limit(limit + 1).options(selectinload(UserActivity.user)).all()
+                activities = rows[:limit]
+                has_next = len(rows) > limit
+                
+                return {
+                    'activities': [activity.to_dict() for activity in activities],
+                    'pagination': {
+                        'limit': limit,
+                        'has_next': has_next,
+                        'next_cursor': self._encode_cursor(activities[-1]) if has_next else None
+                    }
+                }
             
             # Apply pagination
             offset = (page - 1) * limit
-            total_count = query.count()
-            activities = query.offset(offset).limit(limit).options(joinedload(UserActivity.user)).all()
+            # Total computed by a window function in the same SELECT as the page rows,
+            # instead of a second COUNT(*) query over the same filters
+            rows = query.add_columns(func.count().over().label('total_count')) \
+                .offset(offset).limit(limit).options(selectinload(UserActivity.user)).all()
+            activities = [activity for activity, _ in rows]
+            if rows:
+                total_count = rows[0].total_count
+            else:
+                # Page past the end (or no activity): the window gives no row to read from
+                total_count = query.count() if page > 1 else 0
             
             # Calculate pagination info
             total_pages = (total_count + limit - 1) // limit
@@ -124,7 +284,8 @@ class ActivityLogger:
                     'total_count': total_count,
                     'total_pages': total_pages,
                     'has_next': has_next,
-                    'has_prev': has_prev
+                    'has_prev': has_prev,
+                    'next_cursor': self._encode_cursor(activities[-1]) if has_next and activities else None
                 }
             }
 
@@ -150,24 +311,16 @@ class ActivityLogger:
             ActivityLogError: If retrieval fails
         """
         try:
-            now = datetime.now(timezone.utc)
+            period_range = _PERIOD_RANGES.get(period_type)
             
-            if period_type == 'today':
-                start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-            elif period_type == 'week':
-                start_date = now - timedelta(days=7)
-                end_date = now
-            elif period_type == 'month':
-                start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                end_date = now
+            if period_range is not None:
+                start_date, end_date = period_range(datetime.now(timezone.utc))
             elif period_type == 'custom' and custom_date:
                 try:
-                    custom_datetime = datetime.strptime(custom_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    start_date = custom_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-                    end_date = custom_datetime.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    custom_datetime = _parse_day(custom_date)
                 except ValueError:
                     raise ActivityLogError("Invalid date format. Use YYYY-MM-DD", 400, 'INVALID_DATE_FORMAT')
+                start_date, end_date = _day_bounds(custom_datetime)
             else:
                 raise ActivityLogError(f"Invalid period type: {period_type}", 400, 'INVALID_PERIOD_TYPE')
 
@@ -177,7 +330,7 @@ class ActivityLogger:
                     UserActivity.created_at >= start_date,
                     UserActivity.created_at <= end_date
                 )
-            ).order_by(desc(UserActivity.created_at)).options(joinedload(UserActivity.user)).all()
+            ).order_by(desc(UserActivity.created_at)).options(selectinload(UserActivity.user)).all()
 
             return activities
 
@@ -200,44 +353,38 @@ class ActivityLogger:
         try:
             start_date = datetime.now(timezone.utc) - timedelta(days=period_days)
             
-            # Total activities count
-            total_activities = UserActivity.query.filter(
-                and_(
-                    UserActivity.user_id == user_id,
-                    UserActivity.created_at >= start_date
-                )
-            ).count()
-            
-            # Activities by type
-            activities_by_type = db.session.query(
+            # One GROUP BY (action, success) gives the total, the per-type counts and
+            # the success count: at most two rows per activity type come back
+            grouped_counts = db.session.query(
                 UserActivity.action,
+                UserActivity.success,
                 func.count(UserActivity.id).label('count')
             ).filter(
                 and_(
                     UserActivity.user_id == user_id,
                     UserActivity.created_at >= start_date
                 )
-            ).group_by(UserActivity.action).all()
+            ).group_by(UserActivity.action, UserActivity.success).all()
             
-            # Success rate
-            success_count = UserActivity.query.filter(
-                and_(
-                    UserActivity.user_id == user_id,
-                    UserActivity.created_at >= start_date,
-                    UserActivity.success == True
-                )
-            ).count()
+            total_activities = 0
+            success_count = 0
+            activities_by_type = {}
+            for action, success, count in grouped_counts:
+                total_activities += count
+                if success:
+                    success_count += count
+                activities_by_type[action] = activities_by_type.get(action, 0) + count
             
             success_rate = (success_count / total_activities * 100) if total_activities > 0 else 0
             
             # Recent activities (last 5)
             recent_activities = UserActivity.query.filter(
                 UserActivity.user_id == user_id
-            ).order_by(desc(UserActivity.created_at)).limit(5).options(joinedload(UserActivity.user)).all()
+            ).order_by(desc(UserActivity.created_at)).limit(5).options(selectinload(UserActivity.user)).all()
             
             return {
                 'total_activities': total_activities,
-                'activities_by_type': {action: count for action, count in activities_by_type},
+                'activities_by_type': activities_by_type,
                 'success_rate': round(success_rate, 2),
                 'recent_activities': [activity.to_dict() for activity in recent_activities],
                 'period_days': period_days
@@ -260,15 +407,14 @@ class ActivityLogger:
         # Filter by date range
         if 'start_date' in filters and filters['start_date']:
             try:
-                start_date = datetime.strptime(filters['start_date'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                start_date = _parse_day(filters['start_date'])
                 query = query.filter(UserActivity.created_at >= start_date)
             except ValueError:
                 pass  # Ignore invalid date format
         
         if 'end_date' in filters and filters['end_date']:
             try:
-                end_date = datetime.strptime(filters['end_date'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+                _, end_date = _day_bounds(_parse_day(filters['end_date']))
                 query = query.filter(UserActivity.created_at <= end_date)
             except ValueError:
                 pass  # Ignore invalid date format
@@ -279,12 +425,17 @@ class ActivityLogger:
         
         return query
 
-    def cleanup_old_activities(self, days_to_keep: int = 90) -> int:
+    def cleanup_old_activities(self, days_to_keep: int = 90, batch_size: int = 10000) -> int:
         """
         Clean up old activity records to maintain database performance
         
+        Rows are removed by bulk DELETE statements of at most batch_size rows,
+        each committed on its own, so a large purge never holds its locks for
+        the whole run.
+        
         Args:
             days_to_keep: Number of days of activities to keep
+            batch_size: Maximum number of rows removed per DELETE statement
             
         Returns:
             Number of deleted records
@@ -292,11 +443,20 @@ class ActivityLogger:
         try:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
             
-            deleted_count = UserActivity.query.filter(
-                UserActivity.created_at < cutoff_date
-            ).delete()
-            
-            self.db.session.commit()
+            deleted_count = 0
+            while True:
+                batch_ids = db.select(UserActivity.id).where(
+                    UserActivity.created_at < cutoff_date
+                ).limit(batch_size)
+                # No session synchronization: the deleted rows are not loaded in memory
+                deleted = UserActivity.query.filter(
+                    UserActivity.id.in_(batch_ids)
+                ).delete(synchronize_session=False)
+                self.db.session.commit()
+                
+                deleted_count += deleted
+                if deleted < batch_size:
+                    break
             
             return deleted_count
 
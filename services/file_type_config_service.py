@@ -49,6 +49,7 @@ class FileTypeConfigService:
         
         db.session.add(config)
         db.session.commit()
+        FileTypeConfig.invalidate_lookup_index()
         return config
     
     @staticmethod
@@ -84,6 +85,7 @@ class FileTypeConfigService:
         
         config.updated_at = datetime.now(timezone.utc)
         db.session.commit()
+        FileTypeConfig.invalidate_lookup_index()
         return config
     
     @staticmethod
@@ -95,6 +97,7 @@ class FileTypeConfigService:
         
         db.session.delete(config)
         db.session.commit()
+        FileTypeConfig.invalidate_lookup_index()
         return True
     
     @staticmethod
@@ -107,6 +110,7 @@ class FileTypeConfigService:
         config.is_enabled = not config.is_enabled
         config.updated_at = datetime.now(timezone.utc)
         db.session.commit()
+        FileTypeConfig.invalidate_lookup_index()
         return config
     
     @staticmethod
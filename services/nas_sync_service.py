@@ -10,6 +10,11 @@ from utils.nas_utils import normalize_smb_path, get_file_mime_type
 import os
 from typing import Dict, List, Set, Tuple
 
+# Détail par élément des opérations de synchronisation, mis en tampon et écrit en une
+# fois (un print par fichier domine le temps de synchronisation sur de gros volumes) ;
+# NAS_SYNC_VERBOSE=false ne garde que les lignes de synthèse
+SYNC_VERBOSE = os.getenv("NAS_SYNC_VERBOSE", "true").lower() == "true"
+
 class NasSyncService:
     """Service for synchronizing database with actual NAS content"""
     
@@ -26,6 +31,18 @@ class NasSyncService:
             'files_updated': 0,
             'errors': []
         }
+        self._item_log = []
+    
+    def _log_item(self, message: str):
+        """Buffer a per-item sync message instead of printing it immediately"""
+        if SYNC_VERBOSE:
+            self._item_log.append(message)
+    
+    def _flush_item_log(self):
+        """Emit all buffered per-item messages in a single write"""
+        if self._item_log:
+            print("\n".join(self._item_log))
+            self._item_log = []
     
     def _get_smb_client(self):
         """Get SMB client instance"""
@@ -193,13 +210,14 @@ class NasSyncService:
         """
         Remove orphaned database entries with proper foreign key handling
         """
+        removed = "Would remove" if dry_run else "Removed"
         try:
             # Remove orphaned files first (to avoid foreign key issues)
             for file_record in orphaned_entries['orphaned_files']:
                 if not dry_run:
                     db.session.delete(file_record)
                 self.sync_stats['files_removed'] += 1
-                print(f"🗑️  Removed orphaned file: {getattr(file_record, 'path', getattr(file_record, 'file_path', 'unknown'))}")
+                self._log_item(f"🗑️  {removed} orphaned file: {getattr(file_record, 'path', getattr(file_record, 'file_path', 'unknown'))}")
             
             # Remove orphaned folders (start with deepest first to avoid parent-child issues)
             orphaned_folders = sorted(
@@ -215,13 +233,13 @@ class NasSyncService:
                         from models.folder_permission import FolderPermission
                         permissions_deleted = FolderPermission.query.filter_by(folder_id=folder_record.id).delete()
                         if permissions_deleted > 0:
-                            print(f"🗑️  Removed {permissions_deleted} permission(s) for folder: {folder_record.path}")
+                            self._log_item(f"🗑️  Removed {permissions_deleted} permission(s) for folder: {folder_record.path}")
                         
                         # Step 2: Remove any child files that might still reference this folder
                         child_files = File.query.filter_by(folder_id=folder_record.id).all()
                         for child_file in child_files:
                             db.session.delete(child_file)
-                            print(f"🗑️  Removed child file: {getattr(child_file, 'path', getattr(child_file, 'file_path', 'unknown'))}")
+                            self._log_item(f"🗑️  Removed child file: {getattr(child_file, 'path', getattr(child_file, 'file_path', 'unknown'))}")
                         
                         # Step 3: Remove the folder itself
                         db.session.delete(folder_record)
@@ -232,15 +250,20 @@ class NasSyncService:
                         continue
                 
                 self.sync_stats['folders_removed'] += 1
-                print(f"🗑️  Removed orphaned folder: {folder_record.path}")
+                self._log_item(f"🗑️  {removed} orphaned folder: {folder_record.path}")
             
             if not dry_run:
                 db.session.commit()
                 print("✅ Database changes committed successfully")
+            
+            self._flush_item_log()
+            print(f"🗑️  {removed} {self.sync_stats['files_removed']} orphaned file(s) "
+                  f"and {self.sync_stats['folders_removed']} orphaned folder(s)")
                 
             return True
             
         except Exception as e:
+            self._flush_item_log()
             if not dry_run:
                 db.session.rollback()
                 print("❌ Database changes rolled back due to error")
@@ -253,6 +276,7 @@ class NasSyncService:
         """
         Add missing database entries for NAS items
         """
+        added = "Would add" if dry_run else "Added"
         try:
             # Add missing folders first (parents before children)
             missing_folders = sorted(
@@ -289,7 +313,7 @@ class NasSyncService:
                     folder_id_map[folder_info['path']] = new_folder.id
                 
                 self.sync_stats['folders_added'] += 1
-                print(f"➕ Added missing folder: {folder_info['path']}")
+                self._log_item(f"➕ {added} missing folder: {folder_info['path']}")
             
             # Add missing files
             for file_info in missing_entries['missing_files']:
@@ -322,14 +346,19 @@ class NasSyncService:
                     db.session.add(new_file)
                 
                 self.sync_stats['files_added'] += 1
-                print(f"➕ Added missing file: {file_info['path']}")
+                self._log_item(f"➕ {added} missing file: {file_info['path']}")
             
             if not dry_run:
                 db.session.commit()
+            
+            self._flush_item_log()
+            print(f"➕ {added} {self.sync_stats['folders_added']} missing folder(s) "
+                  f"and {self.sync_stats['files_added']} missing file(s)")
                 
             return True
             
         except Exception as e:
+            self._flush_item_log()
             if not dry_run:
                 db.session.rollback()
             error_msg = f"Error adding missing entries: {str(e)}"
@@ -633,7 +633,10 @@ class PermissionAuditLogger:
             cache_hits = 0
             cache_misses = 0
             total_duration = 0
-            durations = []
+            # Accumulateurs courants : pas de liste de durées à construire
+            duration_count = 0
+            min_duration = None
+            max_duration = 0
             
             for log in logs:
                 if log.action == 'PERMISSION_CHECK':
@@ -645,7 +648,11 @@ class PermissionAuditLogger:
                             duration = details.get('performance', {}).get('total_duration_ms', 0)
                             if duration > 0:
                                 total_duration += duration
-                                durations.append(duration)
+                                duration_count += 1
+                                if min_duration is None or duration < min_duration:
+                                    min_duration = duration
+                                if duration > max_duration:
+                                    max_duration = duration
                         except json.JSONDecodeError:
                             pass
                             
@@ -657,7 +664,7 @@ class PermissionAuditLogger:
                     cache_misses += 1
             
             # Calculer les statistiques
-            avg_duration = total_duration / len(durations) if durations else 0
+            avg_duration = total_duration / duration_count if duration_count else 0
             cache_hit_rate = cache_hits / (cache_hits + cache_misses) if (cache_hits + cache_misses) > 0 else 0
             failure_rate = total_failures / total_checks if total_checks > 0 else 0
             
@@ -670,8 +677,8 @@ class PermissionAuditLogger:
                 'cache_misses': cache_misses,
                 'cache_hit_rate': cache_hit_rate,
                 'average_duration_ms': avg_duration,
-                'min_duration_ms': min(durations) if durations else 0,
-                'max_duration_ms': max(durations) if durations else 0,
+                'min_duration_ms': min_duration if min_duration is not None else 0,
+                'max_duration_ms': max_duration,
                 'total_logs_analyzed': len(logs)
             }
             
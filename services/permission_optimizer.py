@@ -1,8 +1,11 @@
+from collections import defaultdict
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Union
 from sqlalchemy import text
 from extensions import db
 from models import User, Group, File, Folder, FilePermission, FolderPermission, PermissionCache
+from models.permission_cache import PermissionBits
+from utils.request_cache import clear_permission_memo
 
 
 @dataclass
@@ -68,23 +71,23 @@ class PermissionOptimizer:
         
         cached_permissions = {}
         
-        for resource_id in resource_ids:
-            cache_entry = PermissionCache.get_cached_permission(
-                user_id=user_id,
-                resource_type=resource_type,
-                resource_id=resource_id
-            )
-            
-            if cache_entry:
-                cached_permissions[resource_id] = PermissionSet(
-                    can_read=cache_entry.can_read,
-                    can_write=cache_entry.can_write,
-                    can_delete=cache_entry.can_delete,
-                    can_share=cache_entry.can_share,
-                    is_owner=cache_entry.is_owner,
-                    source=cache_entry.permission_source
-                )
+        # Single round-trip for all requested resources instead of one lookup per resource
+        cache_entries = PermissionCache.get_cached_permissions_bulk(
+            user_id=user_id,
+            resource_type=resource_type,
+            resource_ids=resource_ids
+        )
         
+        for resource_id, cache_entry in cache_entries.items():
+            cached_permissions[resource_id] = PermissionSet(
+                can_read=cache_entry.can_read,
+                can_write=cache_entry.can_write,
+                can_delete=cache_entry.can_delete,
+                can_share=cache_entry.can_share,
+                is_owner=cache_entry.is_owner,
+                source=cache_entry.permission_source
+            )
+    
         return cached_permissions
     
     def _cache_permissions(self, user_id: int, resource_type: str, 
@@ -100,56 +103,89 @@ class PermissionOptimizer:
         if not self.enable_cache or not permissions:
             return
         
-        for resource_id, perm_set in permissions.items():
-            permissions_dict = {
-                'can_read': perm_set.can_read,
-                'can_write': perm_set.can_write,
-                'can_delete': perm_set.can_delete,
-                'can_share': perm_set.can_share,
-                'is_owner': perm_set.is_owner
-            }
-            
-            PermissionCache.set_cached_permission(
+        entries = {
+            resource_id: (
+                PermissionBits(
+                    perm_set.can_read,
+                    perm_set.can_write,
+                    perm_set.can_delete,
+                    perm_set.can_share,
+                    perm_set.is_owner
+                ),
+                perm_set.source
+            )
+            for resource_id, perm_set in permissions.items()
+        }
+
+        # Commit all cache entries in a single transaction
+        try:
+            PermissionCache.set_cached_permissions_bulk(
                 user_id=user_id,
                 resource_type=resource_type,
-                resource_id=resource_id,
-                permissions_dict=permissions_dict,
-                permission_source=perm_set.source,
+                entries=entries,
                 expiration_hours=self.cache_expiration_hours
             )
-        
-        # Commit the cache entries
-        try:
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             # Log error but don't fail the operation
             print(f"Warning: Failed to cache permissions: {e}")
     
-    def invalidate_user_permissions(self, user_id: int) -> None:
+    def invalidate_user_permissions(self, user_id: int) -> int:
         """
         Invalidate all cached permissions for a specific user.
         
         Args:
             user_id: ID of the user whose cache should be invalidated
+            
+        Returns:
+            Number of invalidated cache entries
         """
+        clear_permission_memo()
+
         if not self.enable_cache:
-            return
+            return 0
         
-        PermissionCache.invalidate_user_cache(user_id)
+        return PermissionCache.invalidate_user_cache(user_id)
     
-    def invalidate_resource_permissions(self, resource_type: str, resource_id: int) -> None:
+    def invalidate_resource_permissions(self, resource_type: str, resource_id: int) -> int:
         """
         Invalidate cached permissions for a specific resource.
         
         Args:
             resource_type: 'file' or 'folder'
             resource_id: ID of the resource whose cache should be invalidated
+            
+        Returns:
+            Number of invalidated cache entries
         """
+        clear_permission_memo()
+
         if not self.enable_cache:
-            return
+            return 0
+        
+        return PermissionCache.invalidate_resource_cache(resource_type, resource_id)
+    
+    def invalidate_resource_permissions_bulk(self, resource_type: str, resource_ids: List[int],
+                                             user_ids: List[int] = None) -> int:
+        """
+        Invalidate cached permissions for many resources of the same type at once.
+        Issues a single DELETE instead of one per resource (and per user).
+        
+        Args:
+            resource_type: 'file' or 'folder'
+            resource_ids: IDs of the resources whose cache should be invalidated
+            user_ids: Optional list of specific user IDs to invalidate, None for all users
+            
+        Returns:
+            Number of invalidated cache entries
+        """
+        clear_permission_memo()
+
+        if not self.enable_cache:
+            return 0
         
-        PermissionCache.invalidate_resource_cache(resource_type, resource_id)
+        return PermissionCache.invalidate_resources_cache(resource_type, resource_ids, user_ids)
     
     def warm_cache_for_user(self, user_id: int, resource_type: str = None, 
                            limit: int = 100) -> Dict[str, int]:
@@ -167,59 +203,92 @@ class PermissionOptimizer:
         if not self.enable_cache:
             return {'files_warmed': 0, 'folders_warmed': 0}
         
-        stats = {'files_warmed': 0, 'folders_warmed': 0}
+        return self.warm_cache_for_users_bulk([user_id], resource_type, limit)[user_id]
+    
+    def warm_cache_for_users_bulk(self, user_ids: List[int], resource_type: str = None,
+                                  limit: int = 100) -> Dict[int, Dict[str, int]]:
+        """
+        Pre-warm the cache for several users at once.
+        The candidate resources of every user are selected with one query per
+        resource type (top `limit` per user) instead of one query per user.
+        
+        Args:
+            user_ids: IDs of the users
+            resource_type: Optional filter for 'file' or 'folder', None for both
+            limit: Maximum number of resources to warm per type and per user
+            
+        Returns:
+            Dictionary mapping user_id to its cache warming statistics
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        stats = {user_id: {'files_warmed': 0, 'folders_warmed': 0} for user_id in user_ids}
+        
+        if not self.enable_cache or not user_ids:
+            return stats
+        
+        params = {'user_ids': user_ids, 'limit': limit}
         
         # Warm file cache
         if resource_type is None or resource_type == 'file':
             # Get recently accessed files by the user (you might want to add access logging)
             # For now, get files owned by the user or in folders they have access to
             file_query = text("""
-                SELECT DISTINCT f.id
-                FROM files f
-                LEFT JOIN folders fold ON f.folder_id = fold.id
-                WHERE f.owner_id = :user_id 
-                   OR fold.owner_id = :user_id
-                   OR EXISTS (
-                       SELECT 1 FROM file_permissions fp 
-                       WHERE fp.file_id = f.id AND fp.user_id = :user_id
-                   )
-                   OR EXISTS (
-                       SELECT 1 FROM folder_permissions folp 
-                       WHERE folp.folder_id = f.folder_id AND folp.user_id = :user_id
-                   )
-                ORDER BY f.id
-                LIMIT :limit
+                SELECT user_id, id FROM (
+                    SELECT u.user_id, f.id,
+                           ROW_NUMBER() OVER (PARTITION BY u.user_id ORDER BY f.id) AS rn
+                    FROM unnest(ARRAY[:user_ids]) AS u(user_id)
+                    CROSS JOIN files f
+                    LEFT JOIN folders fold ON f.folder_id = fold.id
+                    WHERE f.owner_id = u.user_id 
+                       OR fold.owner_id = u.user_id
+                       OR EXISTS (
+                           SELECT 1 FROM file_permissions fp 
+                           WHERE fp.file_id = f.id AND fp.user_id = u.user_id
+                       )
+                       OR EXISTS (
+                           SELECT 1 FROM folder_permissions folp 
+                           WHERE folp.folder_id = f.folder_id AND folp.user_id = u.user_id
+                       )
+                ) ranked
+                WHERE rn <= :limit
+                ORDER BY user_id, id
             """)
             
-            file_result = db.session.execute(file_query, {'user_id': user_id, 'limit': limit})
-            file_ids = [row[0] for row in file_result]
+            file_ids_by_user = defaultdict(list)
+            for row in db.session.execute(file_query, params):
+                file_ids_by_user[row.user_id].append(row.id)
             
-            if file_ids:
+            for user_id, file_ids in file_ids_by_user.items():
                 # Get permissions and cache them
                 file_permissions = self.get_bulk_file_permissions(user_id, file_ids)
-                stats['files_warmed'] = len(file_permissions)
+                stats[user_id]['files_warmed'] = len(file_permissions)
         
         # Warm folder cache
         if resource_type is None or resource_type == 'folder':
             folder_query = text("""
-                SELECT DISTINCT f.id
-                FROM folders f
-                WHERE f.owner_id = :user_id 
-                   OR EXISTS (
-                       SELECT 1 FROM folder_permissions fp 
-                       WHERE fp.folder_id = f.id AND fp.user_id = :user_id
-                   )
-                ORDER BY f.id
-                LIMIT :limit
+                SELECT user_id, id FROM (
+                    SELECT u.user_id, f.id,
+                           ROW_NUMBER() OVER (PARTITION BY u.user_id ORDER BY f.id) AS rn
+                    FROM unnest(ARRAY[:user_ids]) AS u(user_id)
+                    CROSS JOIN folders f
+                    WHERE f.owner_id = u.user_id 
+                       OR EXISTS (
+                           SELECT 1 FROM folder_permissions fp 
+                           WHERE fp.folder_id = f.id AND fp.user_id = u.user_id
+                       )
+                ) ranked
+                WHERE rn <= :limit
+                ORDER BY user_id, id
             """)
             
-            folder_result = db.session.execute(folder_query, {'user_id': user_id, 'limit': limit})
-            folder_ids = [row[0] for row in folder_result]
+            folder_ids_by_user = defaultdict(list)
+            for row in db.session.execute(folder_query, params):
+                folder_ids_by_user[row.user_id].append(row.id)
             
-            if folder_ids:
+            for user_id, folder_ids in folder_ids_by_user.items():
                 # Get permissions and cache them
                 folder_permissions = self.get_bulk_folder_permissions(user_id, folder_ids)
-                stats['folders_warmed'] = len(folder_permissions)
+                stats[user_id]['folders_warmed'] = len(folder_permissions)
         
         return stats
     
@@ -231,25 +300,13 @@ class PermissionOptimizer:
             file_id: ID of the file whose permissions changed
             user_ids: Optional list of specific user IDs to invalidate, None for all users
         """
+        clear_permission_memo()
+
         if not self.enable_cache:
             return
         
-        if user_ids:
-            # Invalidate cache for specific users
-            for user_id in user_ids:
-                cache_entries = PermissionCache.query.filter_by(
-                    user_id=user_id,
-                    resource_type='file',
-                    resource_id=file_id
-                ).all()
-                for entry in cache_entries:
-                    db.session.delete(entry)
-        else:
-            # Invalidate cache for all users on this file
-            self.invalidate_resource_permissions('file', file_id)
-        
         try:
-            db.session.commit()
+            self.invalidate_resource_permissions_bulk('file', [file_id], user_ids)
         except Exception as e:
             db.session.rollback()
             print(f"Warning: Failed to invalidate file permission cache: {e}")
@@ -263,43 +320,19 @@ class PermissionOptimizer:
             folder_id: ID of the folder whose permissions changed
             user_ids: Optional list of specific user IDs to invalidate, None for all users
         """
+        clear_permission_memo()
+
         if not self.enable_cache:
             return
         
-        # Invalidate folder cache
-        if user_ids:
-            for user_id in user_ids:
-                cache_entries = PermissionCache.query.filter_by(
-                    user_id=user_id,
-                    resource_type='folder',
-                    resource_id=folder_id
-                ).all()
-                for entry in cache_entries:
-                    db.session.delete(entry)
-        else:
-            self.invalidate_resource_permissions('folder', folder_id)
-        
-        # Invalidate cache for files in this folder (due to inheritance)
+        # Files in this folder (due to inheritance)
         file_query = text("""
             SELECT id FROM files WHERE folder_id = :folder_id
         """)
         file_result = db.session.execute(file_query, {'folder_id': folder_id})
         file_ids = [row[0] for row in file_result]
         
-        for file_id in file_ids:
-            if user_ids:
-                for user_id in user_ids:
-                    cache_entries = PermissionCache.query.filter_by(
-                        user_id=user_id,
-                        resource_type='file',
-                        resource_id=file_id
-                    ).all()
-                    for entry in cache_entries:
-                        db.session.delete(entry)
-            else:
-                self.invalidate_resource_permissions('file', file_id)
-        
-        # Also invalidate cache for subfolders (recursive inheritance)
+        # Subfolders (recursive inheritance)
         subfolder_query = text("""
             WITH RECURSIVE subfolder_tree AS (
                 SELECT id FROM folders WHERE parent_id = :folder_id
@@ -312,21 +345,10 @@ class PermissionOptimizer:
         subfolder_result = db.session.execute(subfolder_query, {'folder_id': folder_id})
         subfolder_ids = [row[0] for row in subfolder_result]
         
-        for subfolder_id in subfolder_ids:
-            if user_ids:
-                for user_id in user_ids:
-                    cache_entries = PermissionCache.query.filter_by(
-                        user_id=user_id,
-                        resource_type='folder',
-                        resource_id=subfolder_id
-                    ).all()
-                    for entry in cache_entries:
-                        db.session.delete(entry)
-            else:
-                self.invalidate_resource_permissions('folder', subfolder_id)
-        
+        # One DELETE per resource type instead of one per resource and user
         try:
-            db.session.commit()
+            self.invalidate_resource_permissions_bulk('folder', [folder_id] + subfolder_ids, user_ids)
+            self.invalidate_resource_permissions_bulk('file', file_ids, user_ids)
         except Exception as e:
             db.session.rollback()
             print(f"Warning: Failed to invalidate folder permission cache: {e}")
@@ -407,17 +429,11 @@ class PermissionOptimizer:
         Returns:
             Dictionary mapping file_id to PermissionSet
         """
-        # Get user's group IDs for group permission checks
-        user_groups_query = text("""
-            SELECT group_id FROM user_group WHERE user_id = :user_id
-        """)
-        user_groups_result = db.session.execute(user_groups_query, {'user_id': user_id})
-        user_group_ids = [row[0] for row in user_groups_result]
-        
-        # Main query using CTE for optimized permission loading
+        # Main query using CTE for optimized permission loading; group membership is
+        # resolved inside the same statement so direct and group grants cost one round-trip
         query = text("""
             WITH user_groups AS (
-                SELECT unnest(ARRAY[:group_ids]) as group_id
+                SELECT group_id FROM user_group WHERE user_id = :user_id
             ),
             file_direct_perms AS (
                 SELECT 
@@ -443,7 +459,7 @@ class PermissionOptimizer:
                 FROM files f
                 LEFT JOIN file_permissions fp_user ON f.id = fp_user.file_id AND fp_user.user_id = :user_id
                 LEFT JOIN file_permissions fp_group ON f.id = fp_group.file_id 
-                    AND fp_group.group_id = ANY(ARRAY[:group_ids])
+                    AND fp_group.group_id IN (SELECT group_id FROM user_groups)
                 WHERE f.id = ANY(ARRAY[:file_ids])
                 GROUP BY f.id, f.owner_id, f.folder_id, fp_user.can_read, fp_user.can_write, 
                          fp_user.can_delete, fp_user.can_share
@@ -466,8 +482,7 @@ class PermissionOptimizer:
         
         params = {
             'user_id': user_id,
-            'file_ids': file_ids,
-            'group_ids': user_group_ids if user_group_ids else [0]  # Use dummy value if no groups
+            'file_ids': file_ids
         }
         
         result = db.session.execute(query, params)
@@ -560,16 +575,13 @@ class PermissionOptimizer:
         Returns:
             Dictionary mapping folder_id to PermissionSet
         """
-        # Get user's group IDs
-        user_groups_query = text("""
-            SELECT group_id FROM user_group WHERE user_id = :user_id
-        """)
-        user_groups_result = db.session.execute(user_groups_query, {'user_id': user_id})
-        user_group_ids = [row[0] for row in user_groups_result]
-        
-        # Recursive CTE to get folder hierarchy and permissions
+        # Recursive CTE to get folder hierarchy and permissions, with group
+        # membership resolved in the same statement
         query = text("""
-            WITH RECURSIVE folder_hierarchy AS (
+            WITH RECURSIVE user_groups AS (
+                SELECT group_id FROM user_group WHERE user_id = :user_id
+            ),
+            folder_hierarchy AS (
                 -- Base case: requested folders
                 SELECT 
                     f.id as folder_id,
@@ -619,7 +631,7 @@ class PermissionOptimizer:
                 LEFT JOIN folder_permissions fp_user ON fh.folder_id = fp_user.folder_id 
                     AND fp_user.user_id = :user_id
                 LEFT JOIN folder_permissions fp_group ON fh.folder_id = fp_group.folder_id 
-                    AND fp_group.group_id = ANY(ARRAY[:group_ids])
+                    AND fp_group.group_id IN (SELECT group_id FROM user_groups)
                 GROUP BY fh.folder_id, fh.depth, fh.owner_id, fp_user.can_read, 
                          fp_user.can_write, fp_user.can_delete, fp_user.can_share
             )
@@ -642,8 +654,7 @@ class PermissionOptimizer:
         
         params = {
             'user_id': user_id,
-            'folder_ids': folder_ids,
-            'group_ids': user_group_ids if user_group_ids else [0]
+            'folder_ids': folder_ids
         }
         
         result = db.session.execute(query, params)
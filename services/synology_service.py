@@ -1,6 +1,8 @@
 # services/synology_service.py
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 from datetime import datetime, timedelta
@@ -45,7 +47,14 @@ class SynologyDriveAPI:
         self.config = config
         self.session = requests.Session()
         self.session.verify = config.verify_ssl
-        self.session.timeout = config.timeout
+        # Keep-alive connections are reused across calls; one read retry covers
+        # a pooled connection that the NAS closed while idle. Connect errors are
+        # not retried, so an unreachable NAS still fails after a single timeout
+        self.session.mount(
+            f"{'https' if config.use_https else 'http'}://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                        max_retries=Retry(total=1, connect=0, read=1, backoff_factor=0.1))
+        )
         self.auth_token = None
         self.logger = logging.getLogger(__name__)
         
@@ -53,22 +62,20 @@ class SynologyDriveAPI:
         self.base_url = f"{'https' if config.use_https else 'http'}://{config.host}:{config.port}"
         self.api_base = f"{self.base_url}/webapi"
         
+    def _get(self, url: str, params: Dict[str, Any]) -> requests.Response:
+        """GET through the shared session with the configured timeout
+        (requests.Session has no session-wide timeout)"""
+        return self.session.get(url, params=params, timeout=self.config.timeout)
+
+    def _post(self, url: str, data: Dict[str, Any]) -> requests.Response:
+        """POST through the shared session with the configured timeout"""
+        return self.session.post(url, data=data, timeout=self.config.timeout)
+    
     def authenticate(self) -> bool:
         """Authenticate with Synology NAS"""
         try:
-            # Get API info first
-            info_url = f"{self.api_base}/query.cgi"
-            info_params = {
-                'api': 'SYNO.API.Info',
-                'version': '1',
-                'method': 'query',
-                'query': 'SYNO.API.Auth,SYNO.SynologyDrive.Client'
-            }
-            
-            response = self.session.get(info_url, params=info_params)
-            response.raise_for_status()
-            
-            # Authenticate
+            # Authenticate directly: the login call reports an unreachable
+            # server or a missing API just like the former SYNO.API.Info probe
             auth_url = f"{self.api_base}/auth.cgi"
             auth_params = {
                 'api': 'SYNO.API.Auth',
@@ -80,7 +87,7 @@ class SynologyDriveAPI:
                 'format': 'cookie'
             }
             
-            auth_response = self.session.get(auth_url, params=auth_params)
+            auth_response = self._get(auth_url, auth_params)
             auth_response.raise_for_status()
             
             auth_data = auth_response.json()
@@ -112,7 +119,7 @@ class SynologyDriveAPI:
                 '_sid': self.auth_token
             }
             
-            response = self.session.get(config_url, params=config_params)
+            response = self._get(config_url, config_params)
             response.raise_for_status()
             
             data = response.json()
@@ -179,7 +186,7 @@ class SynologyDriveAPI:
                 '_sid': self.auth_token
             }
             
-            response = self.session.get(status_url, params=status_params)
+            response = self._get(status_url, status_params)
             response.raise_for_status()
             
             data = response.json()
@@ -245,7 +252,7 @@ class SynologyDriveAPI:
                 '_sid': self.auth_token
             }
             
-            response = self.session.post(sync_url, data=sync_params)
+            response = self._post(sync_url, sync_params)
             response.raise_for_status()
             
             data = response.json()
@@ -282,7 +289,7 @@ class SynologyDriveAPI:
                 '_sid': self.auth_token
             }
             
-            response = self.session.get(folders_url, params=folders_params)
+            response = self._get(folders_url, folders_params)
             response.raise_for_status()
             
             data = response.json()
@@ -318,7 +325,7 @@ class SynologyDriveAPI:
                     '_sid': self.auth_token
                 }
                 
-                self.session.get(logout_url, params=logout_params)
+                self._get(logout_url, logout_params)
                 self.auth_token = None
                 self.logger.info("Successfully logged out from Synology NAS")
                 
@@ -0,0 +1,71 @@
+# utils/json_provider.py
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Fournisseur JSON Flask basé sur orjson (extension C), plus rapide que le module json
+    standard pour sérialiser les réponses de l'API (listes de fichiers, permissions...).
+
+    La sortie reste compatible avec le fournisseur par défaut : clés triées, clés non
+    chaînes converties, et dates / dataclasses / Decimal délégués à DefaultJSONProvider.default
+    (dates au format HTTP comme avant).
+    """
+
+    _OPTIONS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    ) if orjson is not None else 0
+
+    def _dump_bytes(self, obj, indent=None):
+        options = self._OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs):
+        return self._dump_bytes(obj, kwargs.get("indent")).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = None
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            indent = 2
+        # Les octets produits par orjson vont directement dans la réponse, sans passer par str
+        return self._app.response_class(
+            self._dump_bytes(obj, indent) + b"\n", mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    """Active le fournisseur orjson si le paquet est installé, sinon garde celui de Flask"""
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
+
+
+def _dump_column_json(obj):
+    """Encode JSON columns with orjson (SQLAlchemy expects a str)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def init_db_json_serializer(app):
+    """
+    Encode / decode JSON columns (user_activities.details...) with orjson when
+    installed. Must run before db.init_app: options come from SQLALCHEMY_ENGINE_OPTIONS,
+    and values already set in the configuration are kept.
+    """
+    if orjson is not None:
+        engine_options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+        engine_options.setdefault("json_serializer", _dump_column_json)
+        engine_options.setdefault("json_deserializer", orjson.loads)
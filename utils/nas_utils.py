@@ -1,6 +1,7 @@
 # utils/nas_utils.py
 
 import os
+import re
 import mimetypes
 from werkzeug.utils import secure_filename
 from pathlib import Path
@@ -9,6 +10,12 @@ from datetime import datetime
 
 # ================= UTILITAIRES CHEMIN ==================
 
+# Expressions compilées une seule fois : un seul passage sur la chaîne
+# au lieu d'une boucle Python par caractère interdit
+_REPEATED_SLASHES_RE = re.compile(r"/{2,}")
+_INVALID_PATH_CHARS_RE = re.compile(r'[<>"|?*]')
+_FORBIDDEN_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
 def is_safe_path(path: str, base: str = "/") -> bool:
     """
     Vérifie que le chemin donné est à l'intérieur du chemin de base
@@ -42,8 +49,7 @@ def normalize_smb_path(path: str) -> str:
         normalized = "/" + normalized
     
     # Supprimer les doubles /
-    while "//" in normalized:
-        normalized = normalized.replace("//", "/")
+    normalized = _REPEATED_SLASHES_RE.sub("/", normalized)
     
     # Supprimer le / final sauf pour la racine
     if len(normalized) > 1 and normalized.endswith("/"):
@@ -118,52 +124,53 @@ def format_bytes(size: int) -> str:
 
 def get_file_extension(filename: str) -> str:
     """
-    Retourne l'extension d'un fichier en minuscules
+    Retourne l'extension d'un fichier en minuscules (None si pas de nom)
     """
-    return Path(filename).suffix.lower().lstrip('.')
+    return Path(filename).suffix.lower().lstrip('.') if filename else None
+
+# Extensions par catégorie, construites une seule fois à l'import
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.tiff'})
+DOCUMENT_EXTENSIONS = frozenset({'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.rtf'})
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'})
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'})
+
+# Extension -> catégorie : une seule recherche par fichier dans get_file_category
+_CATEGORY_BY_EXTENSION = {
+    **{ext: "audio" for ext in AUDIO_EXTENSIONS},
+    **{ext: "video" for ext in VIDEO_EXTENSIONS},
+    **{ext: "document" for ext in DOCUMENT_EXTENSIONS},
+    **{ext: "image" for ext in IMAGE_EXTENSIONS},
+}
 
 def is_image_file(filename: str) -> bool:
     """
     Vérifie si le fichier est une image
     """
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.tiff'}
-    return Path(filename).suffix.lower() in image_extensions
+    return Path(filename).suffix.lower() in IMAGE_EXTENSIONS
 
 def is_document_file(filename: str) -> bool:
     """
     Vérifie si le fichier est un document
     """
-    doc_extensions = {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.rtf'}
-    return Path(filename).suffix.lower() in doc_extensions
+    return Path(filename).suffix.lower() in DOCUMENT_EXTENSIONS
 
 def is_video_file(filename: str) -> bool:
     """
     Vérifie si le fichier est une vidéo
     """
-    video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'}
-    return Path(filename).suffix.lower() in video_extensions
+    return Path(filename).suffix.lower() in VIDEO_EXTENSIONS
 
 def is_audio_file(filename: str) -> bool:
     """
     Vérifie si le fichier est un fichier audio
     """
-    audio_extensions = {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'}
-    return Path(filename).suffix.lower() in audio_extensions
+    return Path(filename).suffix.lower() in AUDIO_EXTENSIONS
 
 def get_file_category(filename: str) -> str:
     """
     Retourne la catégorie d'un fichier
     """
-    if is_image_file(filename):
-        return "image"
-    elif is_document_file(filename):
-        return "document"
-    elif is_video_file(filename):
-        return "video"
-    elif is_audio_file(filename):
-        return "audio"
-    else:
-        return "other"
+    return _CATEGORY_BY_EXTENSION.get(Path(filename).suffix.lower(), "other")
 
 # ================= UTILITAIRES NOM ==================
 
@@ -184,30 +191,26 @@ def unique_filename(existing_files: list, filename: str) -> str:
             return candidate
         counter += 1
 
+# Noms réservés Windows (insensibles à la casse, sans extension)
+WINDOWS_RESERVED_NAMES = frozenset({
+    'CON', 'PRN', 'AUX', 'NUL',
+    'COM1', 'COM2', 'COM3', 'COM4', 'COM5', 'COM6', 'COM7', 'COM8', 'COM9',
+    'LPT1', 'LPT2', 'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9'
+})
+
 def sanitize_filename(filename: str) -> str:
     """
     Nettoie un nom de fichier pour qu'il soit compatible avec SMB/Windows
     """
-    # Caractères interdits sur Windows/SMB
-    forbidden_chars = '<>:"/\\|?*'
-    
-    # Remplacer les caractères interdits
-    cleaned = filename
-    for char in forbidden_chars:
-        cleaned = cleaned.replace(char, '_')
+    # Remplacer les caractères interdits sur Windows/SMB
+    cleaned = _FORBIDDEN_FILENAME_CHARS_RE.sub('_', filename)
     
     # Supprimer les espaces en début/fin
     cleaned = cleaned.strip()
     
     # Éviter les noms réservés Windows
-    reserved_names = {
-        'CON', 'PRN', 'AUX', 'NUL',
-        'COM1', 'COM2', 'COM3', 'COM4', 'COM5', 'COM6', 'COM7', 'COM8', 'COM9',
-        'LPT1', 'LPT2', 'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9'
-    }
-    
     name_part = os.path.splitext(cleaned)[0].upper()
-    if name_part in reserved_names:
+    if name_part in WINDOWS_RESERVED_NAMES:
         base, ext = os.path.splitext(cleaned)
         cleaned = f"{base}_file{ext}"
     
@@ -259,29 +262,7 @@ def validate_smb_path(path: str, max_depth: int = 10) -> bool:
         return False
     
     # Vérifier les caractères invalides
-    invalid_chars = '<>"|?*'
-    for char in invalid_chars:
-        if char in normalized:
-            return False
-    
-    return True
-
-def format_smb_file_info(file_obj, path: str = "") -> dict:
-    """
-    Formate les informations d'un fichier SMB en format standardisé
-    """
-    return {
-        'name': file_obj.filename,
-        'path': normalize_smb_path(os.path.join(path, file_obj.filename)),
-        'is_directory': file_obj.isDirectory,
-        'size': file_obj.file_size if not file_obj.isDirectory else None,
-        'size_formatted': format_bytes(file_obj.file_size) if not file_obj.isDirectory else None,
-        'modified': datetime.fromtimestamp(file_obj.last_write_time) if hasattr(file_obj, 'last_write_time') else None,
-        'created': datetime.fromtimestamp(file_obj.create_time) if hasattr(file_obj, 'create_time') else None,
-        'extension': get_file_extension(file_obj.filename) if not file_obj.isDirectory else None,
-        'mime_type': get_file_mime_type(file_obj.filename) if not file_obj.isDirectory else None,
-        'category': get_file_category(file_obj.filename) if not file_obj.isDirectory else 'folder'
-    }
+    return _INVALID_PATH_CHARS_RE.search(normalized) is None
 
 # ================= FORMATAGE SMB ==================
 
@@ -289,8 +270,6 @@ def format_smb_file_info(file_obj, base_path="/", smb_conn=None):
     """
     Formate les informations d'un fichier SMB pour l'API
     """
-    from datetime import datetime
-    
     # Informations de base
     file_info = {
         'name': file_obj.filename,
@@ -341,9 +320,3 @@ def calculate_folder_size(smb_conn, folder_path, shared_folder='NAS'):
         print(f"Erreur lors du calcul de taille pour {folder_path}: {e}")
         
     return total_size
-
-def get_file_extension(filename):
-    """
-    Retourne l'extension d'un fichier
-    """
-    return Path(filename).suffix.lower().lstrip('.') if filename else None
\ No newline at end of file
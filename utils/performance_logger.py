@@ -51,31 +51,31 @@ def performance_monitor(operation_name: str = None,
         operation_type: Type of operation ('permission', 'query', 'bulk', 'general')
     """
     def decorator(func: Callable) -> Callable:
+        # Resolve threshold, name and logger once at decoration time
+        # so the wrapped call only pays for the two clock reads
+        if log_threshold_ms is None:
+            if operation_type == "permission":
+                threshold = PERFORMANCE_CONFIG['PERMISSION_QUERY_THRESHOLD_MS']
+            elif operation_type == "bulk":
+                threshold = PERFORMANCE_CONFIG['BULK_OPERATION_THRESHOLD_MS']
+            else:
+                threshold = PERFORMANCE_CONFIG['SLOW_QUERY_THRESHOLD_MS']
+        else:
+            threshold = log_threshold_ms
+        
+        op_name = operation_name or f"{func.__module__}.{func.__name__}"
+        
+        # Choose appropriate logger
+        logger = permission_logger if operation_type == "permission" else performance_logger
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            start_time = time.perf_counter()
-            
-            # Determine threshold based on operation type
-            if log_threshold_ms is None:
-                if operation_type == "permission":
-                    threshold = PERFORMANCE_CONFIG['PERMISSION_QUERY_THRESHOLD_MS']
-                elif operation_type == "bulk":
-                    threshold = PERFORMANCE_CONFIG['BULK_OPERATION_THRESHOLD_MS']
-                else:
-                    threshold = PERFORMANCE_CONFIG['SLOW_QUERY_THRESHOLD_MS']
-            else:
-                threshold = log_threshold_ms
+            start_ns = time.perf_counter_ns()
             
             try:
                 result = func(*args, **kwargs)
                 
-                end_time = time.perf_counter()
-                duration_ms = (end_time - start_time) * 1000
-                
-                op_name = operation_name or f"{func.__module__}.{func.__name__}"
-                
-                # Choose appropriate logger
-                logger = permission_logger if operation_type == "permission" else performance_logger
+                duration_ms = (time.perf_counter_ns() - start_ns) / 1e6
                 
                 # Log if above threshold
                 if duration_ms >= threshold:
@@ -91,11 +91,7 @@ def performance_monitor(operation_name: str = None,
                 return result
                 
             except Exception as e:
-                end_time = time.perf_counter()
-                duration_ms = (end_time - start_time) * 1000
-                
-                op_name = operation_name or f"{func.__module__}.{func.__name__}"
-                logger = permission_logger if operation_type == "permission" else performance_logger
+                duration_ms = (time.perf_counter_ns() - start_ns) / 1e6
                 logger.error(
                     f"ERROR - {op_name} failed after {duration_ms:.2f}ms - {str(e)}"
                 )
@@ -115,12 +111,12 @@ class PerformanceTracker:
         self.end_time = None
     
     def __enter__(self):
-        self.start_time = time.perf_counter()
+        self.start_time = time.perf_counter_ns()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.end_time = time.perf_counter()
-        duration_ms = (self.end_time - self.start_time) * 1000
+        self.end_time = time.perf_counter_ns()
+        duration_ms = (self.end_time - self.start_time) / 1e6
         
         if exc_type is not None:
             performance_logger.error(
@@ -138,10 +134,14 @@ class PerformanceTracker:
     
     @property
     def duration_ms(self) -> float:
-        """Get the duration in milliseconds."""
-        if self.start_time and self.end_time:
-            return (self.end_time - self.start_time) * 1000
-        return 0.0
+        """
+        Get the duration in milliseconds.
+        Inside the block this is the time elapsed so far.
+        """
+        if self.start_time is None:
+            return 0.0
+        end_time = self.end_time if self.end_time is not None else time.perf_counter_ns()
+        return (end_time - self.start_time) / 1e6
 
 
 def log_permission_query_stats(user_id: int, resource_type: str, resource_count: int, 
@@ -246,6 +246,7 @@ def compare_performance(legacy_duration_ms: float, optimized_duration_ms: float,
         f"resources: {resource_count}"
     )
 
+
 # Import performance metrics service
 try:
     from backend.services.performance_metrics import get_performance_metrics, MetricType
@@ -1,8 +1,10 @@
 # utils/permission_middleware.py
 
 from functools import wraps
+from operator import attrgetter
 from flask import jsonify
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.orm import selectinload
 from models.user import User
 from models.file import File
 from models.folder import Folder
@@ -12,6 +14,14 @@ from typing import List, Dict, Union
 # Initialize permission optimizer with caching enabled
 permission_optimizer = PermissionOptimizer(enable_cache=True)
 
+# Accesseurs précompilés action -> drapeau de permission (évite getattr dynamique par ressource)
+PERMISSION_FLAG_GETTERS = {
+    'read': attrgetter('can_read'),
+    'write': attrgetter('can_write'),
+    'delete': attrgetter('can_delete'),
+    'share': attrgetter('can_share')
+}
+
 def require_resource_permission(resource_type, action):
     """
     Décorateur optimisé pour vérifier les permissions sur une ressource spécifique.
@@ -110,14 +120,8 @@ def check_user_can_access_resource(user, resource, action='read'):
     if not effective_perm:
         return False
         
-    permission_map = {
-        'read': 'can_read',
-        'write': 'can_write',
-        'delete': 'can_delete', 
-        'share': 'can_share'
-    }
-    
-    return getattr(effective_perm, permission_map.get(action, 'can_read'), False)
+    get_flag = PERMISSION_FLAG_GETTERS.get(action, PERMISSION_FLAG_GETTERS['read'])
+    return get_flag(effective_perm)
 
 def get_user_accessible_resources(user, resource_type='both', limit=None):
     """
@@ -136,12 +140,16 @@ def get_user_accessible_resources(user, resource_type='both', limit=None):
     if user.role == 'admin':
         # Admin voit tout
         if resource_type in ['files', 'both']:
-            query = File.query
+            query = File.query.options(selectinload(File.owner), selectinload(File.folder))
             if limit:
                 query = query.limit(limit)
             accessible['files'] = query.all()
         if resource_type in ['folders', 'both']:
-            query = Folder.query
+            query = Folder.query.options(
+                selectinload(Folder.owner),
+                selectinload(Folder.children),
+                selectinload(Folder.files)
+            )
             if limit:
                 query = query.limit(limit)
             accessible['folders'] = query.all()
@@ -207,8 +215,11 @@ def get_user_accessible_files_optimized(user, limit=None):
     if not accessible_file_ids:
         return []
     
-    # Récupérer les objets File
-    return File.query.filter(File.id.in_(accessible_file_ids)).all()
+    # Récupérer les objets File avec leurs relations sérialisées (évite le N+1)
+    return File.query.options(
+        selectinload(File.owner),
+        selectinload(File.folder)
+    ).filter(File.id.in_(accessible_file_ids)).all()
 
 def get_user_accessible_folders_optimized(user, limit=None):
     """
@@ -255,8 +266,12 @@ def get_user_accessible_folders_optimized(user, limit=None):
     if not accessible_folder_ids:
         return []
     
-    # Récupérer les objets Folder
-    return Folder.query.filter(Folder.id.in_(accessible_folder_ids)).all()
+    # Récupérer les objets Folder avec leurs relations sérialisées (évite le N+1)
+    return Folder.query.options(
+        selectinload(Folder.owner),
+        selectinload(Folder.children),
+        selectinload(Folder.files)
+    ).filter(Folder.id.in_(accessible_folder_ids)).all()
 
 def check_batch_resource_permissions(user_id: int, resources: List[Dict], action: str = 'read') -> Dict[int, bool]:
     """
@@ -284,19 +299,24 @@ def check_batch_resource_permissions(user_id: int, resources: List[Dict], action
     
     results = {}
     
+    # Action inconnue : aucune permission accordée
+    get_flag = PERMISSION_FLAG_GETTERS.get(action)
+    if get_flag is None:
+        return {res['id']: False for res in resources}
+    
     # Vérifier les permissions des fichiers en lot
     if file_ids:
         file_permissions = permission_optimizer.get_bulk_file_permissions(user_id, file_ids)
         for file_id in file_ids:
             perm = file_permissions.get(file_id)
-            results[file_id] = perm and getattr(perm, f'can_{action}', False) if perm else False
+            results[file_id] = get_flag(perm) if perm else False
     
     # Vérifier les permissions des dossiers en lot
     if folder_ids:
         folder_permissions = permission_optimizer.get_bulk_folder_permissions(user_id, folder_ids)
         for folder_id in folder_ids:
             perm = folder_permissions.get(folder_id)
-            results[folder_id] = perm and getattr(perm, f'can_{action}', False) if perm else False
+            results[folder_id] = get_flag(perm) if perm else False
     
     return results
 
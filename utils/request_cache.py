@@ -0,0 +1,56 @@
+from functools import wraps
+from flask import g, has_request_context
+
+# Attribute name used on flask.g to hold the per-request permission memo
+_PERMISSION_MEMO_ATTR = "_permission_memo"
+
+
+def get_permission_memo():
+    """
+    Return the permission memo for the current request.
+    Returns None outside of a request context (scripts, background jobs),
+    in which case callers must not memoize anything.
+    """
+    if not has_request_context():
+        return None
+    memo = g.get(_PERMISSION_MEMO_ATTR)
+    if memo is None:
+        memo = {}
+        setattr(g, _PERMISSION_MEMO_ATTR, memo)
+    return memo
+
+
+def clear_permission_memo():
+    """
+    Drop every memoized permission of the current request.
+    Called at the start of each request and whenever permissions are invalidated.
+    """
+    if has_request_context():
+        setattr(g, _PERMISSION_MEMO_ATTR, {})
+
+
+def request_memoized_permissions(resource_type):
+    """
+    Decorator memoizing get_effective_permissions(self, user) for the duration of a request.
+    The same (user, resource) pair is resolved at most once per request, which avoids
+    repeated optimizer/cache round-trips when a route checks the same resource several times.
+
+    Args:
+        resource_type: 'file' or 'folder', part of the memo key
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, user):
+            memo = get_permission_memo()
+            if memo is None or user is None or self.id is None:
+                return func(self, user)
+
+            key = (resource_type, user.id, self.id)
+            if key in memo:
+                return memo[key]
+
+            result = func(self, user)
+            memo[key] = result
+            return result
+        return wrapper
+    return decorator
@@ -5,6 +5,9 @@ from pathlib import Path
 import os
 import io
 import tempfile
+import threading
+import time
+from functools import wraps
 from datetime import datetime
 from dotenv import load_dotenv
 from utils.nas_utils import (
@@ -17,6 +20,23 @@ from utils.nas_utils import (
 
 load_dotenv()
 
+# Délai max de la sonde ECHO qui vérifie une connexion SMB réutilisée
+SMB_ECHO_TIMEOUT_SECONDS = int(os.getenv("SMB_ECHO_TIMEOUT_SECONDS", "5"))
+# Inactivité (s) au-delà de laquelle la connexion est vérifiée par un ECHO avant usage
+SMB_IDLE_CHECK_SECONDS = float(os.getenv("SMB_IDLE_CHECK_SECONDS", "30"))
+
+def _serialize_smb(method):
+    """Exécute la méthode sous le verrou du client : une instance partagée entre les
+    threads de requête n'envoie qu'un seul échange SMB à la fois sur sa connexion"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._last_used = time.monotonic()
+    return wrapper
+
 class SMBClientNAS:
     """Connexion au NAS Synology via SMB avec gestion d'erreurs robuste"""
     
@@ -33,6 +53,9 @@ class SMBClientNAS:
         
         self.conn = None
         self._connected = False
+        self._last_used = 0.0
+        # Réentrant : certaines opérations en appellent d'autres (test_connection -> list_files)
+        self._lock = threading.RLock()
         self._connect()
 
     def _connect(self):
@@ -49,6 +72,7 @@ class SMBClientNAS:
             
             if self.conn.connect(self.server_ip, self.port):
                 self._connected = True
+                self._last_used = time.monotonic()
                 print(f"Connexion SMB réussie vers {self.server_ip}:{self.port}")
             else:
                 raise Exception("Échec de connexion SMB")
@@ -60,8 +84,19 @@ class SMBClientNAS:
 
     def _ensure_connected(self):
         """S'assure que la connexion SMB est active"""
-        if not self._connected or not self.conn:
-            self._connect()
+        if self._connected and self.conn:
+            # Connexion réutilisée : utilisée récemment, elle est supposée vivante ;
+            # après une période d'inactivité, un ECHO vérifie qu'elle l'est toujours
+            if time.monotonic() - self._last_used < SMB_IDLE_CHECK_SECONDS:
+                return
+            try:
+                self.conn.echo(b'ping', timeout=SMB_ECHO_TIMEOUT_SECONDS)
+                return
+            except Exception as e:
+                print(f"Connexion SMB perdue ({str(e)}), reconnexion...")
+                self.close_connection()
+                self._connected = False
+        self._connect()
 
     def _reconnect_if_needed(self):
         """Reconnecte si nécessaire lors d'une erreur"""
@@ -71,6 +106,7 @@ class SMBClientNAS:
             print(f"Échec de reconnexion: {str(e)}")
             raise
 
+    @_serialize_smb
     def list_files(self, path="/"):
         """Liste les fichiers et dossiers dans un chemin"""
         self._ensure_connected()
@@ -108,6 +144,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de lister {path}: {str(e2)}")
 
+    @_serialize_smb
     def upload_file(self, file_obj, dest_path, filename, overwrite=False):
         """Upload un fichier sur le NAS"""
         self._ensure_connected()
@@ -159,6 +196,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible d'uploader {filename}: {str(e2)}")
 
+    @_serialize_smb
     def download_file(self, file_path):
         """Télécharge un fichier depuis le NAS"""
         self._ensure_connected()
@@ -184,6 +222,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de télécharger {file_path}: {str(e2)}")
 
+    @_serialize_smb
     def delete_file(self, path):
         """Supprime un fichier ou dossier"""
         self._ensure_connected()
@@ -226,6 +265,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de supprimer {path}: {str(e2)}")
 
+    @_serialize_smb
     def delete_file_recursive(self, path):
         """Supprime un fichier ou dossier de manière récursive (pour les admins)"""
         self._ensure_connected()
@@ -261,6 +301,7 @@ class SMBClientNAS:
             print(f"Erreur suppression récursive {path}: {str(e)}")
             raise Exception(f"Impossible de supprimer récursivement {path}: {str(e)}")
 
+    @_serialize_smb
     def rename_file(self, old_path, new_name):
         """Renomme un fichier ou dossier"""
         self._ensure_connected()
@@ -299,6 +340,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de renommer {old_path}: {str(e2)}")
 
+    @_serialize_smb
     def move_file(self, source_path, dest_path):
         """Déplace un fichier ou dossier"""
         self._ensure_connected()
@@ -334,6 +376,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de déplacer {source_path}: {str(e2)}")
 
+    @_serialize_smb
     def create_folder(self, path, folder_name):
         """Crée un nouveau dossier"""
         self._ensure_connected()
@@ -368,6 +411,7 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible de créer le dossier {folder_name}: {str(e2)}")
 
+    @_serialize_smb
     def get_file_info(self, file_path):
         """Obtient les informations d'un fichier"""
         self._ensure_connected()
@@ -406,15 +450,18 @@ class SMBClientNAS:
             except Exception as e2:
                 raise Exception(f"Impossible d'obtenir les infos de {file_path}: {str(e2)}")
 
+    @_serialize_smb
     def path_exists(self, path):
         """Vérifie si un chemin existe"""
         try:
+            self._ensure_connected()
             path = normalize_smb_path(path)
             self.conn.getAttributes(self.share_name, path)
             return True
         except:
             return False
 
+    @_serialize_smb
     def test_connection(self):
         """Teste la connexion SMB"""
         try:
@@ -439,6 +486,7 @@ class SMBClientNAS:
                 "error": str(e)
             }
 
+    @_serialize_smb
     def close_connection(self):
         """Ferme la connexion SMB"""
         if self.conn and self._connected: